@@ -1,55 +1,336 @@
 #!/usr/bin/env python3
 """
 VJudge Team Maker — Local Excel Mode (improved & robust)
-Requirements: pandas, openpyxl
+Requirements: pandas, numpy, openpyxl
 You may put those in requirements.txt or install manually:
     pip install pandas openpyxl
+
+Heavy libraries (pandas, numpy, openpyxl) are imported lazily inside the stages that
+need them, so --help, dependency checks and cache hits start fast.
 """
 
+from __future__ import annotations
+
 import os
+import io
+import re
 import sys
+import glob
+import json
+import fnmatch
 import math
+import time
+import pickle
+import shutil
+import heapq
+import random
+import hashlib
+import argparse
+import datetime
 import subprocess
-import pandas as pd
-from collections import defaultdict
+import contextlib
+import tracemalloc
+from collections import Counter, defaultdict
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:  # annotations only; imported lazily at runtime
+    import numpy as np
+    import pandas as pd
+
+try:
+    import resource  # Unix only; used for peak RSS in --profile mode
+except ImportError:
+    resource = None
 
 # ---------- Config ----------
 REQUIREMENTS_FILE = "requirements.txt"   # keep lowercase, consistent
+# Import name -> pip requirement, checked at startup (installed only with --install-deps)
+REQUIRED_MODULES = {"pandas": "pandas", "numpy": "numpy", "openpyxl": "openpyxl"}
+# Kept apart from CACHE_DIR so --clear-cache, --no-cache and cache eviction never touch it
+DEPS_STAMP_FILE = ".ranker_deps.json"
 LEADERBOARDS_DIR = "Leaderboards"
 OUT_FILE = "final_teams.xlsx"
+DEFAULT_TEAM_SIZE = 3
 
 # Points formula config — change to match your preferred formula
 # Example: return math.ceil(1800 / (rank + 5))
 POINTS_NUMERATOR = 1600
 POINTS_OFFSET = 7
 
+# Points per file. Rank formulas (vectorized over a contest's rank array, see SCORING_FORMULAS):
+#   "hyperbolic"  - the formula above
+#   "linear"      - LINEAR_MAX_POINTS at rank 1, LINEAR_STEP less per rank, down to 0
+#   "exponential" - EXPONENTIAL_MAX_POINTS * EXPONENTIAL_DECAY ** (rank - 1)
+#   "percentile"  - PERCENTILE_MAX_POINTS times the share of the field ranked at or below you
+#   "codeforces"  - Elo-style performance against an evenly rated field: CODEFORCES_SCALE
+#                   points per factor 10 in the odds of beating a random rival (0 below the median)
+# "problems" reads the per-problem cells and gives SOLVE_POINTS per accepted problem minus one
+# point per PENALTY_MINUTES_PER_POINT of its ICPC penalty (AC minute + WRONG_ATTEMPT_MINUTES
+# per wrong try), but at least 1 point.
+# A --scoring-config file can pick the formula, its parameters and a weight per contest file.
+
+# Aggregation: FinalPoints = points matrix @ contest weights. A contest's weight is its
+# "weight" entry in the scoring config, times 0.5 ** (age / HALF_LIFE_DAYS) with time decay
+# on. Age counts days before the newest contest; the date comes from the config entry
+# ("date") or a YYYY-MM-DD / YYYYMMDD in the file name. None disables decay.
+HALF_LIFE_DAYS = None
+CONTEST_DATE = re.compile(r"(?<!\d)(\d{4})[-_.]?(\d{2})[-_.]?(\d{2})(?!\d)")
+AGGREGATION_KEYS = ("weight", "date")  # scoring config keys that don't change a file's points
+# How the (weighted) per-contest points of a participant become FinalPoints: "sum", "best"
+# (the best BEST_K contests), "trimmed" (mean without the TRIM_FRACTION lowest and highest
+# contests) or "median". A missed contest counts as 0 points.
+AGGREGATION = "sum"
+AGGREGATIONS = ("sum", "best", "trimmed", "median")
+BEST_K = None
+TRIM_FRACTION = 0.1
+
+# Ratings (--ratings): multi-player Elo over the contests in date order (see contest_date;
+# undated contests follow in file-name order). Each participant plays everyone else in the
+# contest and moves by RATING_K * weight * (actual - expected wins) / (n - 1), where weight
+# is the contest's "weight" in the scoring config. RANK_BY picks the column that orders the
+# Participants sheet and feeds team formation.
+RATING_INITIAL = 1500
+RATING_K = 32
+RATING_SCALE = 400
+RANK_BY = "points"
+RANK_BY_CHOICES = ("points", "rating")
+POINTS_FORMULA = "hyperbolic"
+RANK_FORMULAS = ("hyperbolic", "linear", "exponential", "percentile", "codeforces")
+POINTS_FORMULAS = RANK_FORMULAS + ("problems",)
+LINEAR_MAX_POINTS = 200
+LINEAR_STEP = 2
+EXPONENTIAL_MAX_POINTS = 200
+EXPONENTIAL_DECAY = 0.9
+PERCENTILE_MAX_POINTS = 200
+CODEFORCES_SCALE = 100
+SOLVE_POINTS = 100
+PENALTY_MINUTES_PER_POINT = 20
+WRONG_ATTEMPT_MINUTES = 20
+
+# Excel writer engine: "pandas" (pd.ExcelWriter, full in-memory model), "write_only"
+# (openpyxl streaming workbook), "xlsxwriter" (optional, constant_memory mode) or "auto",
+# which streams once the output has more than LARGE_OUTPUT_ROWS participant rows.
+WRITE_ENGINE = "auto"
+WRITE_ENGINES = ("auto", "pandas", "write_only", "xlsxwriter")
+LARGE_OUTPUT_ROWS = 300
+
+# Team sheet layout: "long" (one Teams sheet, one row per member with a TeamId column),
+# "wide" (one Teams sheet, one row per team) or "sheets" (a Team_{i} sheet per team).
+TEAM_LAYOUT = "long"
+TEAM_LAYOUTS = ("long", "wide", "sheets")
+
+# Team formation strategy over the sorted Participants table:
+#   "sequential" - consecutive chunks (top scorers together), "snake" - snake draft,
+#   "greedy" - largest first into the weakest open team (heap),
+#   "kk" - Karmarkar–Karp style round differencing + swap local search (lowest variance)
+TEAM_STRATEGY = "sequential"
+TEAM_STRATEGIES = ("sequential", "snake", "greedy", "kk")
+LOCAL_SEARCH_PASSES = 200
+
+# Constraint solver (--constraints FILE): local search budget, stops early once stuck
+CONSTRAINT_KEYS = {"must_pair", "must_not_pair", "seniors", "max_seniors",
+                   "institutions", "max_per_institution", "institution_quotas"}
+SOLVER_TIME_LIMIT = 5.0  # seconds
+SOLVER_ITERATIONS = 200000
+SOLVER_SEED = 0
+
+# Output formats: the Excel workbook and/or typed tables next to it
+# (<output stem>_participants.<ext> and <output stem>_teams.<ext>)
+OUTPUT_FORMATS = ("xlsx", "parquet", "feather", "csv")
+OUTPUT_FORMAT = "xlsx"
+
+# Parsed-standings cache: (username, rank) arrays per input file, keyed by content hash.
+# Bump CACHE_VERSION whenever the parsing/cleaning rules change.
+CACHE_DIR = ".ranker_cache"
+CACHE_MAX_BYTES = 64 * 1024 * 1024
+CACHE_VERSION = 1
+
+# Incremental mode state: per-file digests/contributions and FinalPoints of the last run
+STATE_FILE = ".ranker_state.pkl"
+STATE_VERSION = 2
+
+# Watch mode: poll the leaderboards directory every WATCH_INTERVAL seconds and re-rank once
+# it has been quiet for WATCH_DEBOUNCE seconds (exports often land as bursts of writes)
+WATCH_INTERVAL = 1.0
+WATCH_DEBOUNCE = 2.0
+
+# Standings files picked up from the leaderboards directory
+EXCEL_EXTENSIONS = (".xlsx", ".xls")
+TEXT_EXTENSIONS = {".csv": ",", ".tsv": "\t"}  # extension -> delimiter
+PARQUET_EXTENSIONS = (".parquet", ".pq")
+STANDINGS_EXTENSIONS = EXCEL_EXTENSIONS + tuple(TEXT_EXTENSIONS) + PARQUET_EXTENSIONS
+
 # Possible column names for username/handle and rank (case-insensitive matching)
 USERNAME_COLUMNS = ["Username", "username", "Team", "team", "Handle", "handle"]
 RANK_COLUMNS = ["Rank", "rank", "POSITION", "Position", "position"]
 
+# VJudge per-problem columns are headed "A\n6 / 11" (label, then solved / tried); a cell is
+# "1:32:32\n(-1)" (accepted at 1:32:32 after one wrong try), "(-2)" (two wrong tries) or " "
+PROBLEM_HEADER = re.compile(r"^([A-Z]{1,2}\d{0,2})(?:\s|$)")
+PROBLEM_CELL_PATTERN = r"^\s*(?:(\d+):(\d{1,2}):(\d{1,2}))?\s*(?:\(-(\d+)\))?\s*$"
+
+# Excel reader engine: "openpyxl" streams only the Username/Rank cells (read-only mode),
+# "pandas" loads the whole sheet through pd.read_excel. .xls files always use pandas.
+READ_ENGINE = "openpyxl"
+READ_ENGINES = ("openpyxl", "pandas")
+
+
+# ---------- Profiling ----------
+def peak_rss_bytes():
+    """High-water mark of this process's resident memory, or None where unsupported."""
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == "darwin" else rss * 1024  # KiB on Linux, bytes on macOS
+
+
+class StageProfiler:
+    """
+    Records wall time, CPU time, peak RSS and (optionally) the tracemalloc peak per pipeline
+    stage. Disabled by default, in which case stage() costs next to nothing.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.trace_memory = False
+        self.rows = []
+
+    def enable(self, trace_memory: bool = False):
+        self.enabled = True
+        self.trace_memory = trace_memory
+        self.rows = []
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @contextlib.contextmanager
+    def stage(self, name: str, nested: bool = False):
+        """Time the block as stage `name`; nested stages leave the enclosing tracemalloc peak alone."""
+        if not self.enabled:
+            yield
+            return
+        trace = self.trace_memory and not nested
+        if trace:
+            tracemalloc.reset_peak()
+        row = self.record(name)  # reserve the slot so stages are listed in start order
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            row.update(wall=time.perf_counter() - wall, cpu=time.process_time() - cpu,
+                       peak_rss=peak_rss_bytes(),
+                       traced_peak=tracemalloc.get_traced_memory()[1] if trace else None)
+
+    def record(self, name: str, wall: float = 0.0, cpu: float = 0.0, peak_rss=None, traced_peak=None):
+        """Add a row measured elsewhere (e.g. in a worker process). CPU time is per process."""
+        row = {"stage": name, "wall": wall, "cpu": cpu, "peak_rss": peak_rss, "traced_peak": traced_peak}
+        if self.enabled:
+            self.rows.append(row)
+        return row
+
+    def summary(self) -> str:
+        def mib(n):
+            return "-" if n is None else f"{n / (1 << 20):.1f}"
+
+        width = max([len("stage")] + [len(r["stage"]) for r in self.rows])
+        lines = [f"{'stage':<{width}}  {'wall s':>9}  {'cpu s':>9}  {'rss MiB':>9}  {'traced MiB':>10}"]
+        for r in self.rows:
+            lines.append(f"{r['stage']:<{width}}  {r['wall']:>9.3f}  {r['cpu']:>9.3f}  "
+                         f"{mib(r['peak_rss']):>9}  {mib(r['traced_peak']):>10}")
+        return "\n".join(lines)
+
+    def dump_json(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.rows, f, indent=2)
+
+
+PROFILER = StageProfiler()
+
 
 # ---------- Helpers ----------
-def points_for_rank(rank: int) -> int:
-    """Compute points based on rank using configurable numerator/offset."""
+def points_for_rank(rank: int, numerator: int = None, offset: int = None) -> int:
+    """Compute points based on rank using configurable numerator/offset (POINTS_* by default)."""
     if rank is None or rank < 1:
         return 0
-    return math.ceil(POINTS_NUMERATOR / (rank + POINTS_OFFSET))
+    numerator = POINTS_NUMERATOR if numerator is None else numerator
+    offset = POINTS_OFFSET if offset is None else offset
+    return math.ceil(numerator / (rank + offset))
 
 
-def safe_install_requirements(req_file: str):
-    """Install dependencies listed in req_file (line by line). Non-fatal on errors."""
-    if not os.path.exists(req_file):
+def deps_stamp_key() -> dict:
+    """What a successful dependency check depends on: the interpreter and its site-packages."""
+    paths = [p for p in sys.path if os.path.basename(p) in ("site-packages", "dist-packages") and os.path.isdir(p)]
+    return {
+        "executable": sys.executable,
+        "version": sys.version,
+        "modules": sorted(REQUIRED_MODULES),
+        "mtimes": [os.stat(p).st_mtime for p in paths],
+    }
+
+
+def missing_dependencies() -> list:
+    """Import names from REQUIRED_MODULES that can't be found (find_spec, nothing is imported)."""
+    from importlib.util import find_spec
+
+    return [name for name in REQUIRED_MODULES if find_spec(name) is None]
+
+
+def check_dependencies(install: bool = False, stamp_file: str = DEPS_STAMP_FILE) -> bool:
+    """
+    Cheap startup check that the required modules are importable. A successful result is
+    remembered in stamp_file until the interpreter or its package directories change.
+    With install=True, missing modules are pip-installed first. Returns True if all are present.
+    """
+    key = deps_stamp_key()
+    if not install:
+        try:
+            with open(stamp_file, "r", encoding="utf-8") as f:
+                if json.load(f) == key:
+                    return True
+        except (OSError, ValueError):
+            pass
+
+    missing = missing_dependencies()
+    if missing and install:
+        safe_install_requirements(REQUIREMENTS_FILE, [REQUIRED_MODULES[name] for name in missing])
+        missing = missing_dependencies()
+    if missing:
+        print(f"❌ Missing dependencies: {', '.join(missing)}. "
+              f"Install them with: pip install {' '.join(REQUIRED_MODULES[m] for m in missing)} "
+              f"(or rerun with --install-deps).")
+        return False
+
+    try:
+        os.makedirs(os.path.dirname(stamp_file) or ".", exist_ok=True)
+        with open(stamp_file, "w", encoding="utf-8") as f:
+            json.dump(deps_stamp_key(), f)
+    except OSError:
+        pass
+    return True
+
+
+def safe_install_requirements(req_file: str, default_deps=None):
+    """
+    Install dependencies listed in req_file (line by line). Non-fatal on errors.
+    default_deps are installed instead when req_file doesn't exist.
+    """
+    if not os.path.exists(req_file) and os.path.exists(req_file.capitalize()):
+        req_file = req_file.capitalize()  # the repo ships Requirements.txt
+
+    if os.path.exists(req_file):
+        with open(req_file, "r", encoding="utf-8") as f:
+            deps = [line.strip() for line in f if line.strip() and not line.strip().startswith("#")]
+        source = req_file
+    elif default_deps:
+        deps, source = list(default_deps), "defaults"
+    else:
         print(f"[info] requirements file '{req_file}' not found — skipping install.")
         return
 
-    with open(req_file, "r", encoding="utf-8") as f:
-        deps = [line.strip() for line in f if line.strip() and not line.strip().startswith("#")]
-
     if not deps:
-        print(f"[info] No dependencies found in {req_file}.")
+        print(f"[info] No dependencies found in {source}.")
         return
 
-    print(f"[info] Installing {len(deps)} dependencies from {req_file}...")
+    print(f"[info] Installing {len(deps)} dependencies from {source}...")
     for dep in deps:
         print(f"  → Installing: {dep}")
         try:
@@ -60,160 +341,2120 @@ def safe_install_requirements(req_file: str):
     print("[info] Dependency installation attempt finished.")
 
 
-def find_column_name(df: pd.DataFrame, candidates):
-    """Return first matching column name in df columns from candidates, else None."""
-    cols_lower = {c.lower(): c for c in df.columns}
+def find_column_index(header, candidates):
+    """Return index of the first matching header cell from candidates, else None."""
+    cols_lower = {str(c).strip().lower(): i for i, c in enumerate(header) if c is not None}
     for cand in candidates:
         if cand.lower() in cols_lower:
             return cols_lower[cand.lower()]
     return None
 
 
-def read_excel_file(file_path: str):
-    """Read an Excel file and return a list of (username, rank) tuples."""
+def is_blank(value) -> bool:
+    """True for empty cells (None / NaN) without needing pandas."""
+    return value is None or (isinstance(value, float) and math.isnan(value))
+
+
+def clean_standing(raw_user, raw_rank):
+    """Turn raw Username/Rank cells into a (username, rank) tuple, or None if unusable."""
+    if is_blank(raw_user):
+        return None
+    username = str(raw_user).strip()
+    if not username:
+        return None
+
+    if is_blank(raw_rank):
+        return None
+    try:
+        # handle floats like 1.0 and numeric strings like "1"
+        rank = int(float(raw_rank))
+    except Exception:
+        return None
+    if rank < 1:
+        return None
+
+    return username, rank
+
+
+def standings_columns(header) -> list:
+    """Header indices of the Username and Rank columns; ValueError if either is missing."""
+    user_idx = find_column_index(header, USERNAME_COLUMNS)
+    rank_idx = find_column_index(header, RANK_COLUMNS)
+    if user_idx is None or rank_idx is None:
+        raise ValueError(f"Couldn't find Username or Rank columns. "
+                         f"Available columns: {[c for c in header if c is not None]}")
+    return [user_idx, rank_idx]
+
+
+def excel_engine(file_path: str, engine: str = None) -> str:
+    """The read engine actually used for an Excel file (legacy .xls always needs pandas)."""
+    engine = engine or READ_ENGINE
+    if engine not in READ_ENGINES:
+        raise ValueError(f"Unknown read engine '{engine}'. Choose one of {READ_ENGINES}.")
+    if file_path.lower().endswith(".xls"):
+        return "pandas"  # openpyxl can't open legacy .xls workbooks
+    return engine
+
+
+def iter_selected_cells_openpyxl(file_path: str, select):
+    """
+    Stream an .xlsx file using openpyxl read-only mode, touching only the header row and the
+    cells of the columns select(header) picks (a list of header indices).
+    Yields the header, then the selected cells of each data row (None past a short row).
+    """
+    from openpyxl import load_workbook
+
+    wb = load_workbook(file_path, read_only=True, data_only=True)
     try:
-        df = pd.read_excel(file_path)
+        rows = wb.active.iter_rows(values_only=True)
+        header = list(next(rows, None) or ())
+        wanted = select(header)
+        yield header
+        for row in rows:
+            yield [row[i] if i < len(row) else None for i in wanted]
+    finally:
+        wb.close()
+
+
+def iter_standings_openpyxl(file_path: str):
+    """
+    Stream (username, rank) tuples from an .xlsx file using openpyxl read-only mode.
+    Only the header row plus the Username/Rank cells of each row are touched.
+    Raises ValueError if the header has no Username or Rank column.
+    """
+    rows = iter_selected_cells_openpyxl(file_path, standings_columns)
+    next(rows)  # header
+    for raw_user, raw_rank in rows:
+        standing = clean_standing(raw_user, raw_rank)
+        if standing is not None:
+            yield standing
+
+
+def read_columns(file_path: str, select, engine: str = None):
+    """
+    Raw cells of the columns select(header) picks from any standings file. Returns (header,
+    DataFrame whose columns are numbered 0.. in select order). Excel files are streamed with
+    openpyxl or loaded with pandas (see excel_engine); CSV/TSV go through the pandas C
+    parser, which only parses the selected columns (as text); Parquet only loads the
+    selected columns (needs pyarrow). Raises ValueError for unsupported file types and
+    whatever select raises (ValueError for missing columns).
+    """
+    import pandas as pd
+
+    ext = os.path.splitext(file_path)[1].lower()
+    if ext in EXCEL_EXTENSIONS and excel_engine(file_path, engine) == "openpyxl":
+        rows = iter_selected_cells_openpyxl(file_path, select)
+        header = next(rows)
+        return header, pd.DataFrame(list(rows), columns=range(len(select(header))), dtype=object)
+
+    if ext in EXCEL_EXTENSIONS:
+        df = pd.read_excel(file_path, dtype=object)
+        header = list(df.columns)
+        wanted = select(header)
+        frame = df.iloc[:, wanted]
+    elif ext in TEXT_EXTENSIONS:
+        delimiter = TEXT_EXTENSIONS[ext]
+        header = list(pd.read_csv(file_path, sep=delimiter, nrows=0).columns)
+        wanted = select(header)
+        # keep_default_na=False so handles like "NA" or "null" stay usernames
+        df = pd.read_csv(file_path, sep=delimiter, usecols=wanted, dtype=str, keep_default_na=False, engine="c")
+        in_file_order = sorted(wanted)  # usecols keeps the file's column order
+        frame = df.iloc[:, [in_file_order.index(i) for i in wanted]]
+    elif ext in PARQUET_EXTENSIONS:
+        import pyarrow.parquet as pq
+
+        header = pq.read_schema(file_path).names
+        wanted = select(header)
+        frame = pd.read_parquet(file_path, columns=[header[i] for i in wanted], engine="pyarrow")
+    else:
+        raise ValueError(f"Unsupported standings file type '{ext}'")
+
+    frame = frame.astype(object)
+    frame.columns = range(len(wanted))
+    return header, frame
+
+
+def report_read_error(file_path: str, error: Exception):
+    """Print why a standings file is skipped: missing columns warn, anything else is an error."""
+    if isinstance(error, ValueError):
+        print(f"[warn] {error} in {file_path}. Skipping file.")
+    elif isinstance(error, ImportError) and file_path.lower().endswith(PARQUET_EXTENSIONS):
+        print(f"❌ Error reading file {file_path}: {error}. Parquet input needs pyarrow (pip install pyarrow).")
+    else:
+        print(f"❌ Error reading file {file_path}: {error}")
+
+
+def read_excel_file(file_path: str, engine: str = None):
+    """
+    Read an Excel file and return a list of (username, rank) tuples.
+    engine: "openpyxl" (streaming, default) or "pandas"; see READ_ENGINE.
+    """
+    engine = excel_engine(file_path, engine)
+    try:
+        if engine == "openpyxl":
+            return list(iter_standings_openpyxl(file_path))
+        _, df = read_columns(file_path, standings_columns, engine)
     except Exception as e:
-        print(f"❌ Error reading file {file_path}: {e}")
+        report_read_error(file_path, e)
         return []
+    return parse_standings_frame(df, 0, 1)
 
-    user_col = find_column_name(df, USERNAME_COLUMNS)
-    rank_col = find_column_name(df, RANK_COLUMNS)
 
-    if user_col is None or rank_col is None:
-        print(f"[warn] Couldn't find Username or Rank columns in {file_path}. "
-              f"Available columns: {list(df.columns)}. Skipping file.")
+def read_standings_file(file_path: str, engine: str = None):
+    """
+    Read any supported standings file (.xlsx/.xls, .csv/.tsv, .parquet) and return a list
+    of (username, rank) tuples. engine only applies to Excel files, see read_excel_file.
+    """
+    ext = os.path.splitext(file_path)[1].lower()
+    if ext in EXCEL_EXTENSIONS:
+        return read_excel_file(file_path, engine)
+    if ext not in TEXT_EXTENSIONS and ext not in PARQUET_EXTENSIONS:
+        print(f"[warn] Unsupported standings file type '{ext}': {file_path}. Skipping file.")
+        return []
+
+    try:
+        _, df = read_columns(file_path, standings_columns)
+    except Exception as e:
+        report_read_error(file_path, e)
         return []
+    return parse_standings_frame(df, 0, 1)
 
-    standings = []
-    for _, row in df.iterrows():
-        raw_user = row.get(user_col)
-        raw_rank = row.get(rank_col)
 
-        if pd.isna(raw_user):
-            continue
-        username = str(raw_user).strip()
-        if not username:
+def parse_standings_frame(df: pd.DataFrame, user_col, rank_col):
+    """
+    Vectorized cleaning of the Username/Rank columns (same rules as clean_standing):
+    strip usernames, drop blanks, coerce ranks to int and drop ranks below 1.
+    Returns a list of (username, rank) tuples in sheet order.
+    """
+    import numpy as np
+
+    usernames, ranks, keep = clean_standings_columns(df[user_col], df[rank_col])
+    return list(zip(usernames[keep].tolist(), ranks[keep].astype(np.int64).tolist()))
+
+
+def clean_standings_columns(users: pd.Series, raw_ranks: pd.Series):
+    """
+    Returns (stripped usernames, truncated float ranks, keep mask) for raw Username/Rank
+    columns; keep marks the rows clean_standing would accept.
+    """
+    import numpy as np
+    import pandas as pd
+
+    ranks = pd.to_numeric(raw_ranks.astype(str).str.strip(), errors="coerce")
+    ranks = ranks.where(raw_ranks.notna())
+
+    usernames = users.astype(str).str.strip()
+    ranks = np.trunc(ranks.to_numpy(dtype=float))
+    keep = users.notna().to_numpy() & (usernames != "").to_numpy() & np.isfinite(ranks) & (ranks >= 1)
+    return usernames.to_numpy(), ranks, keep
+
+
+# ---------- Per-problem results ----------
+def problem_columns(header) -> list:
+    """(index, label) of the VJudge per-problem columns in header: "A\n6 / 11" -> "A"."""
+    found = []
+    for i, name in enumerate(header):
+        match = PROBLEM_HEADER.match(str(name).strip()) if name is not None else None
+        if match:
+            found.append((i, match.group(1)))
+    return found
+
+
+def decode_problem_cells(cells) -> tuple:
+    """
+    Decode a 2-D array of raw per-problem cells into (solved bool, ac_seconds int32 (-1 if
+    unsolved), wrong int16) arrays of the same shape. Cells are factorized first, so the
+    regex only runs once per distinct cell text ("(-1)", " ", … repeat a lot).
+    """
+    import numpy as np
+    import pandas as pd
+
+    cells = np.asarray(cells, dtype=object)
+    flat = pd.Series(cells.ravel(), dtype=object).fillna("").astype(str)
+    codes, uniques = pd.factorize(flat)
+    parts = pd.Series(uniques, dtype=object).str.extract(PROBLEM_CELL_PATTERN)
+    hours, minutes, seconds, wrong = (pd.to_numeric(parts[k]).to_numpy(dtype=float) for k in range(4))
+
+    solved = ~np.isnan(hours)
+    ac_seconds = np.where(solved, hours * 3600 + minutes * 60 + seconds, -1).astype(np.int32)
+    wrong = np.nan_to_num(wrong).astype(np.int16)
+    return (solved[codes].reshape(cells.shape), ac_seconds[codes].reshape(cells.shape),
+            wrong[codes].reshape(cells.shape))
+
+
+def problem_frame_columns(header) -> list:
+    """Header indices of Username, Rank and the problem columns; ValueError without Username/Rank."""
+    return standings_columns(header) + [i for i, _ in problem_columns(header)]
+
+
+def read_problem_standings(file_path: str, engine: str = None):
+    """
+    Read a standings file with its per-problem results. Returns a dict of compact arrays,
+    one row per accepted standing (same cleaning as read_standings_file):
+    {"usernames", "ranks" int32, "problems" labels, "solved" bool, "ac_seconds" int32, "wrong" int16}
+    where the last three have shape (rows, problems). None if the file can't be read.
+    """
+    import numpy as np
+
+    try:
+        header, df = read_columns(file_path, problem_frame_columns, engine)
+    except Exception as e:
+        report_read_error(file_path, e)
+        return None
+
+    usernames, ranks, keep = clean_standings_columns(df[0], df[1])
+    solved, ac_seconds, wrong = decode_problem_cells(df.iloc[:, 2:].to_numpy(dtype=object)[keep])
+    return {
+        "usernames": usernames[keep].tolist(),
+        "ranks": ranks[keep].astype(np.int32),
+        "problems": [label for _, label in problem_columns(header)],
+        "solved": solved,
+        "ac_seconds": ac_seconds,
+        "wrong": wrong,
+    }
+
+
+def problem_table_standings(table: dict) -> list:
+    """(username, rank) standings of a per-problem table."""
+    return list(zip(table["usernames"], table["ranks"].tolist()))
+
+
+# ---------- Parsed-standings cache ----------
+def file_digest(path: str) -> str:
+    """SHA-256 of the file contents."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def cache_entry_path(cache_dir: str, digest: str, kind: str = "") -> str:
+    """kind: "" for standings, "problems" for per-problem tables of the same file."""
+    return os.path.join(cache_dir, f"v{CACHE_VERSION}-{digest}{'-' + kind if kind else ''}.pkl")
+
+
+def cache_read(cache_dir: str, digest: str, kind: str = ""):
+    """Return the unpickled cache entry, or None on a miss / unreadable entry."""
+    entry = cache_entry_path(cache_dir, digest, kind)
+    try:
+        with open(entry, "rb") as f:
+            value = pickle.load(f)
+    except Exception:
+        return None
+    os.utime(entry)  # mark as recently used for eviction
+    return value
+
+
+def cache_write(cache_dir: str, digest: str, value, kind: str = ""):
+    """Pickle value into the cache entry atomically. Non-fatal on errors."""
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        entry = cache_entry_path(cache_dir, digest, kind)
+        tmp = f"{entry}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, entry)  # atomic, safe with parallel workers
+    except OSError as e:
+        print(f"[warn] Couldn't write cache entry: {e}")
+
+
+def cache_load(cache_dir: str, digest: str):
+    """Return cached standings for digest, or None on a miss / unreadable entry."""
+    value = cache_read(cache_dir, digest)
+    if value is None:
+        return None
+    usernames, ranks = value
+    return list(zip(usernames, ranks.tolist()))
+
+
+def cache_store(cache_dir: str, digest: str, standings):
+    """Store standings as a pickled (usernames list, int32 rank array) pair. Non-fatal on errors."""
+    import numpy as np
+
+    usernames = [u for u, _ in standings]
+    ranks = np.fromiter((r for _, r in standings), dtype=np.int32, count=len(standings))
+    cache_write(cache_dir, digest, (usernames, ranks))
+
+
+def cache_evict(cache_dir: str, max_bytes: int = CACHE_MAX_BYTES):
+    """Delete least-recently-used cache entries until the cache fits in max_bytes."""
+    if not os.path.isdir(cache_dir):
+        return
+    entries = []
+    for name in os.listdir(cache_dir):
+        path = os.path.join(cache_dir, name)
+        try:
+            st = os.stat(path)
+        except OSError:
             continue
+        entries.append((st.st_mtime, st.st_size, path))
 
-        # Parse rank robustly
-        rank = None
-        if pd.isna(raw_rank):
-            # leave rank as None (skip or treat as 0)
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+            total -= size
+        except OSError:
             pass
-        else:
-            try:
-                # handle floats like 1.0
-                rank = int(float(raw_rank))
-                if rank < 1:
-                    rank = None
-            except Exception:
-                rank = None
-
-        if rank is None:
-            # Skip rows without valid rank (or choose to set a default)
-            continue
 
-        standings.append((username, rank))
 
+def cache_clear(cache_dir: str):
+    """Remove the whole cache directory."""
+    if os.path.isdir(cache_dir):
+        shutil.rmtree(cache_dir, ignore_errors=True)
+        print(f"[info] Cleared cache '{cache_dir}'.")
+
+
+def load_cached_standings(path: str, engine: str = None, cache_dir: str = None):
+    """read_standings_file, served from / stored into the parsed-standings cache when cache_dir is set."""
+    digest = None
+    if cache_dir:
+        try:
+            digest = file_digest(path)
+        except OSError as e:
+            print(f"❌ Error reading file {path}: {e}")
+            return []
+        standings = cache_load(cache_dir, digest)
+        if standings is not None:
+            print(f"[info] Loaded {len(standings)} rows from cache.")
+            return standings
+
+    standings = read_standings_file(path, engine)
+    if digest and standings:
+        cache_store(cache_dir, digest, standings)
     return standings
 
 
-def write_participants_and_teams_to_excel(all_scores: dict, team_size: int, out_file: str = OUT_FILE):
-    """Write participants with their scores for each file and calculate the FinalPoints."""
-    # Collect all usernames
-    usernames = set()
-    for file_scores in all_scores.values():
-        usernames.update(file_scores.keys())
+def load_cached_problems(path: str, engine: str = None, cache_dir: str = None):
+    """read_problem_standings, served from / stored into the cache when cache_dir is set."""
+    digest = None
+    if cache_dir:
+        try:
+            digest = file_digest(path)
+        except OSError as e:
+            print(f"❌ Error reading file {path}: {e}")
+            return None
+        table = cache_read(cache_dir, digest, "problems")
+        if table is not None:
+            print(f"[info] Loaded {len(table['usernames'])} rows with per-problem results from cache.")
+            return table
+
+    table = read_problem_standings(path, engine)
+    if digest and table is not None and table["usernames"]:
+        cache_write(cache_dir, digest, table, "problems")
+    return table
 
-    # Build participant rows
-    participants_data = []
-    file_names_order = list(all_scores.keys())
-    for username in usernames:
-        row = {"Username": username}
-        for file in file_names_order:
-            row[file] = all_scores[file].get(username, 0)
-        participants_data.append(row)
 
-    if not participants_data:
-        print("[warn] No participant data to write.")
+def load_standings(path: str, engine: str = None, cache_dir: str = None, problems: bool = False):
+    """
+    Worker for (parallel) file parsing: read one file and capture everything it prints,
+    so the parent can replay per-file warnings/errors in a deterministic order.
+    problems: also decode the per-problem cells (see read_problem_standings).
+    Returns (standings, problem table or None, log_text, stats) where stats holds the
+    worker's wall/cpu/peak_rss.
+    """
+    buf = io.StringIO()
+    wall, cpu = time.perf_counter(), time.process_time()
+    table = None
+    with contextlib.redirect_stdout(buf):
+        if problems:
+            table = load_cached_problems(path, engine, cache_dir)
+            standings = problem_table_standings(table) if table is not None else []
+        else:
+            standings = load_cached_standings(path, engine, cache_dir)
+    stats = {"wall": time.perf_counter() - wall, "cpu": time.process_time() - cpu, "peak_rss": peak_rss_bytes()}
+    return standings, table, buf.getvalue(), stats
+
+
+def load_all_standings(paths, jobs: int = 1, engine: str = None, cache_dir: str = None, problems=()):
+    """
+    Parse every file in paths, in a process pool when jobs > 1. Per-problem tables are
+    decoded for the paths in `problems`.
+    Yields (path, standings, problem table, log_text, stats) in the given order.
+    """
+    if jobs > 1 and len(paths) > 1:
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(max_workers=min(jobs, len(paths))) as pool:
+            futures = [pool.submit(load_standings, path, engine, cache_dir, path in problems) for path in paths]
+            for path, future in zip(paths, futures):
+                yield (path, *future.result())
+    else:
+        for path in paths:
+            yield (path, *load_standings(path, engine, cache_dir, path in problems))
+
+    if cache_dir:
+        cache_evict(cache_dir)
+
+
+# ---------- Scoring ----------
+# Rank formulas take the int64 rank array of one contest plus its field size n (largest
+# rank) and return int64 points for every row at once.
+def hyperbolic_points(ranks: np.ndarray, n: int, numerator: int = None, offset: int = None) -> np.ndarray:
+    """Vectorized points_for_rank: ceil(numerator / (rank + offset)) in integer arithmetic."""
+    import numpy as np
+
+    numerator = POINTS_NUMERATOR if numerator is None else numerator
+    offset = POINTS_OFFSET if offset is None else offset
+    return np.asarray(-(-numerator // (ranks + offset)), dtype=np.int64)
+
+
+def linear_points(ranks: np.ndarray, n: int, max_points: int = LINEAR_MAX_POINTS, step: int = LINEAR_STEP) -> np.ndarray:
+    import numpy as np
+
+    return np.maximum(0, max_points - step * (ranks - 1)).astype(np.int64)
+
+
+def exponential_points(ranks: np.ndarray, n: int, max_points: int = EXPONENTIAL_MAX_POINTS,
+                       decay: float = EXPONENTIAL_DECAY) -> np.ndarray:
+    import numpy as np
+
+    return np.ceil(max_points * np.power(decay, ranks - 1.0)).astype(np.int64)
+
+
+def percentile_points(ranks: np.ndarray, n: int, max_points: int = PERCENTILE_MAX_POINTS) -> np.ndarray:
+    import numpy as np
+
+    return np.ceil(max_points * (n - ranks + 1) / max(n, 1)).astype(np.int64)
+
+
+def codeforces_points(ranks: np.ndarray, n: int, scale: float = CODEFORCES_SCALE) -> np.ndarray:
+    import numpy as np
+
+    # Rank r of n means beating n - r rivals: odds (n - r + 0.5) / (r - 0.5), Elo-style log10
+    odds = (n - ranks + 0.5) / (ranks - 0.5)
+    return np.maximum(0, np.rint(scale * np.log10(odds))).astype(np.int64)
+
+
+SCORING_FORMULAS = {
+    "hyperbolic": hyperbolic_points,
+    "linear": linear_points,
+    "exponential": exponential_points,
+    "percentile": percentile_points,
+    "codeforces": codeforces_points,
+}
+
+
+def rank_points(ranks: np.ndarray, formula: str = None, **params) -> np.ndarray:
+    """Points of a whole contest's rank array under one of RANK_FORMULAS."""
+    import numpy as np
+
+    formula = formula or POINTS_FORMULA
+    if formula not in SCORING_FORMULAS:
+        raise ValueError(f"Unknown rank formula '{formula}'. Choose one of {RANK_FORMULAS}.")
+    ranks = np.asarray(ranks, dtype=np.int64)
+    n = int(ranks.max()) if len(ranks) else 0
+    return SCORING_FORMULAS[formula](ranks, n, **params)
+
+
+def load_scoring_config(path: str):
+    """
+    Read a per-contest scoring JSON file, or None with a message if it is unusable:
+
+        {"default": {"formula": "hyperbolic", "weight": 1},
+         "contests": {"*Final*": {"formula": "codeforces", "weight": 2, "date": "2025-05-30"},
+                      "Rank-Warmup.xlsx": {"formula": "linear", "step": 5, "weight": 0.5}},
+         "half_life_days": 90}
+
+    Contest keys are file names or glob patterns (the first match wins); other keys of an
+    entry are parameters of its formula (e.g. numerator/offset for hyperbolic).
+    "weight", "date" and "half_life_days" only affect the aggregation (see HALF_LIFE_DAYS).
+    Formula parameters are checked per file once entries are merged, see check_scoring_spec.
+    """
+    try:
+        with open(path, encoding="utf-8") as f:
+            config = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"❌ Couldn't read scoring config '{path}': {e}")
+        return None
+    if not isinstance(config, dict):
+        print(f"❌ Scoring config '{path}' must contain a JSON object.")
+        return None
+
+    half_life = config.get("half_life_days")
+    if half_life is not None and (not isinstance(half_life, (int, float)) or half_life <= 0):
+        print(f"❌ Scoring config '{path}': half_life_days must be a positive number, got {half_life!r}")
+        return None
+
+    contests = config.get("contests", {})
+    if not isinstance(contests, dict):
+        print(f"❌ Scoring config '{path}': contests must be an object of name/glob -> entry, "
+              f"got {type(contests).__name__}")
+        return None
+
+    entries = [("default", config.get("default", {}))] + list(contests.items())
+    for name, spec in entries:
+        if not isinstance(spec, dict):
+            print(f"❌ Scoring config '{path}', entry '{name}': must be an object, got {spec!r}")
+            return None
+        formula = spec.get("formula", POINTS_FORMULA)
+        weight = spec.get("weight", 1)
+        date = spec.get("date")
+        try:
+            if date is not None:
+                datetime.date.fromisoformat(str(date))
+            if formula not in POINTS_FORMULAS:
+                raise ValueError(f"unknown formula '{formula}', choose one of {POINTS_FORMULAS}")
+            if not isinstance(weight, (int, float)) or weight < 0:
+                raise ValueError(f"weight must be a non-negative number, got {weight!r}")
+        except (TypeError, ValueError) as e:
+            print(f"❌ Scoring config '{path}', entry '{name}': {e}")
+            return None
+    return config
+
+
+def check_scoring_spec(spec: dict):
+    """
+    Raise ValueError/TypeError if a merged spec (see contest_scoring) can't be scored: an
+    unknown formula or parameters its formula doesn't take.
+    """
+    import numpy as np
+
+    spec = scoring_spec(spec)
+    formula = spec.pop("formula", POINTS_FORMULA)
+    if formula not in POINTS_FORMULAS:
+        raise ValueError(f"unknown formula '{formula}', choose one of {POINTS_FORMULAS}")
+    if formula == "problems":
+        if spec:
+            raise ValueError("the problems formula takes no parameters")
         return
+    rank_points(np.array([1, 2]), formula, **spec)
+
+
+def contest_scoring(fname: str, config: dict = None, formula: str = None) -> dict:
+    """
+    Scoring spec {"formula", "weight", **params} of one standings file: the command-line
+    formula, overridden by config["default"], then by the first config["contests"] key
+    equal to or matching (glob) fname. An entry that switches to another formula doesn't
+    inherit the previous formula's parameters (only the AGGREGATION_KEYS).
+    """
+    spec = {"formula": formula or POINTS_FORMULA, "weight": 1}
+    if config:
+        contests = config.get("contests", {})
+        match = contests.get(fname)
+        if match is None:
+            match = next((entry for pattern, entry in contests.items() if fnmatch.fnmatch(fname, pattern)), {})
+        for entry in (config.get("default", {}), match):
+            if entry.get("formula", spec["formula"]) != spec["formula"]:
+                spec = {k: v for k, v in spec.items() if k in AGGREGATION_KEYS}
+            spec.update(entry)
+    return spec
+
+
+def scoring_spec(spec: dict) -> dict:
+    """The part of a contest's spec that determines its points (without AGGREGATION_KEYS)."""
+    return {k: v for k, v in spec.items() if k not in AGGREGATION_KEYS}
+
+
+def best_ranks(standings) -> dict:
+    """{username: rank} of (username, rank) standings; a user listed more than once keeps their best rank."""
+    return dict(sorted(standings, key=lambda row: row[1], reverse=True))
+
+
+def best_scores(usernames: list, points: np.ndarray) -> dict:
+    """{username: points}; a user listed more than once keeps their best row."""
+    scores = dict(zip(usernames, points.tolist()))
+    if len(scores) < len(usernames):
+        # If a user appears multiple times within a file (unlikely), keep the maximum for that file
+        scores = {}
+        for username, pts in zip(usernames, points.tolist()):
+            scores[username] = max(scores.get(username, pts), pts)
+    return scores
+
 
-    participants_df = pd.DataFrame(participants_data)
-    # Sum FinalPoints
-    score_cols = [c for c in participants_df.columns if c != "Username"]
-    participants_df["FinalPoints"] = participants_df[score_cols].sum(axis=1)
-    # Sort descending by FinalPoints, tiebreak by Username for determinism
-    participants_df = participants_df.sort_values(by=["FinalPoints", "Username"], ascending=[False, True]).reset_index(drop=True)
-
-    # Write to Excel with teams
-    with pd.ExcelWriter(out_file, engine="openpyxl") as writer:
-        participants_df.to_excel(writer, sheet_name="Participants", index=False)
-        print(f"[ok] Saved Participants sheet to '{out_file}'")
-
-        # Build teams sequentially
-        teams = [participants_df.iloc[i:i + team_size].reset_index(drop=True) for i in range(0, len(participants_df), team_size)]
-        for i, team_df in enumerate(teams, start=1):
-            sheet_name = f"Team_{i}"
-            team_df.to_excel(writer, sheet_name=sheet_name, index=False)
+def score_standings(standings, numerator: int = None, offset: int = None, spec: dict = None) -> dict:
+    """
+    Map (username, rank) standings of one file to {username: points}, evaluating the rank
+    formula of spec (see contest_scoring; hyperbolic by default) for all rows at once.
+    numerator/offset: hyperbolic parameters unless spec sets its own. The "problems" formula
+    falls back to hyperbolic here (files without per-problem columns).
+    """
+    import numpy as np
+
+    spec = scoring_spec(spec or {})
+    formula = spec.pop("formula", POINTS_FORMULA)
+    if formula in ("hyperbolic", "problems"):
+        formula = "hyperbolic"
+        spec.setdefault("numerator", numerator)
+        spec.setdefault("offset", offset)
+
+    usernames = [u for u, _ in standings]
+    ranks = np.fromiter((r for _, r in standings), dtype=np.int64, count=len(standings))
+    return best_scores(usernames, rank_points(ranks, formula, **spec))
+
+
+def score_problems(table: dict) -> dict:
+    """
+    {username: points} from a per-problem table (see POINTS_FORMULA "problems"), computed for
+    all rows at once; a user listed twice keeps their best row, like score_standings.
+    """
+    import numpy as np
+
+    penalty = table["ac_seconds"] // 60 + WRONG_ATTEMPT_MINUTES * table["wrong"].astype(np.int32)
+    per_problem = np.maximum(1, SOLVE_POINTS - penalty // PENALTY_MINUTES_PER_POINT)
+    points = np.where(table["solved"], per_problem, 0).sum(axis=1)
+    return best_scores(table["usernames"], points)
+
+
+# ---------- Contest weights ----------
+def contest_date(fname: str, spec: dict = None):
+    """A contest's date: spec["date"] (ISO) or a YYYY-MM-DD / YYYYMMDD in the file name, else None."""
+    if spec and spec.get("date"):
+        return datetime.date.fromisoformat(str(spec["date"]))
+    match = CONTEST_DATE.search(fname)
+    if match:
+        try:
+            return datetime.date(*map(int, match.groups()))
+        except ValueError:
+            return None
+    return None
+
+
+def contest_weights(specs: dict, half_life_days: float = None) -> dict:
+    """
+    {fname: weight} for the aggregation from {fname: spec} (see contest_scoring), with time
+    decay 0.5 ** (days before the newest dated contest / half_life_days) when half_life_days
+    is set. Undated contests aren't decayed. Returns None when every weight is 1.
+    """
+    weights = {fname: float(spec.get("weight", 1)) for fname, spec in specs.items()}
+    if half_life_days:
+        dates = {fname: contest_date(fname, spec) for fname, spec in specs.items()}
+        dated = {fname: d for fname, d in dates.items() if d is not None}
+        undated = sorted(set(specs) - set(dated))
+        if undated:
+            print(f"[warn] No date for {len(undated)} contest(s) (e.g. {undated[0]}); they aren't decayed.")
+        if dated:
+            newest = max(dated.values())
+            for fname, d in dated.items():
+                weights[fname] *= 0.5 ** ((newest - d).days / half_life_days)
+    if all(w == 1 for w in weights.values()):
+        return None
+    return weights
+
+
+# ---------- Ratings ----------
+def rating_order(specs: dict) -> list:
+    """Contest files in the order they're rated: dated ones by date, then the undated ones (see contest_date)."""
+    dates = {fname: contest_date(fname, spec) for fname, spec in specs.items()}
+    return sorted(specs, key=lambda f: (dates[f] is None, dates[f] or datetime.date.min))
+
+
+def expected_wins(ratings: np.ndarray, scale: float = RATING_SCALE, block: int = 1024) -> np.ndarray:
+    """
+    Expected number of players each one beats in a contest of the given ratings (Elo
+    logistic, summed over every pair). Ratings are binned to whole points, so the pairwise
+    sum runs over distinct values times their counts, in blocks: a 20k-player field usually
+    has at most a few thousand distinct ratings. The expectations still sum to n(n-1)/2.
+    """
+    import numpy as np
+
+    values, inverse, counts = np.unique(np.rint(ratings), return_inverse=True, return_counts=True)
+    expected = np.empty(len(values))
+    for start in range(0, len(values), block):
+        diff = values[None, :] - values[start:start + block, None]
+        expected[start:start + block] = (counts / (1 + 10 ** (diff / scale))).sum(axis=1)
+    return expected[inverse] - 0.5  # a player's own pairing with itself
+
+
+def actual_wins(ranks: np.ndarray) -> np.ndarray:
+    """Players each one finished ahead of, a tie counting half, from the sorted ranks."""
+    import numpy as np
+
+    sorted_ranks = np.sort(ranks)
+    left = np.searchsorted(sorted_ranks, ranks, side="left")
+    right = np.searchsorted(sorted_ranks, ranks, side="right")
+    return (len(ranks) - right) + 0.5 * (right - left - 1)
+
+
+def elo_ratings(contests: list, k: float = None, initial: float = None) -> dict:
+    """
+    Multi-player Elo: contests is [({username: rank}, weight)] in chronological order;
+    returns {username: rating} after the last one. Players start at initial (RATING_INITIAL).
+    """
+    import numpy as np
+    import pandas as pd
+
+    k = RATING_K if k is None else k
+    lengths = [len(ranks) for ranks, _ in contests]
+    players = np.empty(sum(lengths), dtype=object)
+    pos = 0
+    for (ranks, _), n in zip(contests, lengths):
+        players[pos:pos + n] = list(ranks)
+        pos += n
+    ids, usernames = pd.factorize(players)
+
+    ratings = np.full(len(usernames), float(RATING_INITIAL if initial is None else initial))
+    pos = 0
+    for (ranks, weight), n in zip(contests, lengths):
+        idx = ids[pos:pos + n]
+        pos += n
+        if n < 2:
+            continue
+        rank = np.fromiter(ranks.values(), dtype=np.float64, count=n)
+        ratings[idx] += k * weight * (actual_wins(rank) - expected_wins(ratings[idx])) / (n - 1)
+    return dict(zip(usernames, ratings.tolist()))
+
+
+# ---------- Incremental state ----------
+def state_params(numerator: int = None, offset: int = None) -> tuple:
+    """
+    Settings that invalidate all saved per-file contributions when they change (each file
+    also keeps the scoring spec it was scored with, see contest_scoring).
+    """
+    return (STATE_VERSION, CACHE_VERSION,
+            POINTS_NUMERATOR if numerator is None else numerator,
+            POINTS_OFFSET if offset is None else offset,
+            (SOLVE_POINTS, PENALTY_MINUTES_PER_POINT, WRONG_ATTEMPT_MINUTES))
+
+
+# state file path -> (file signature, state) of the last load/save in this process, so a
+# resident process (--watch) doesn't unpickle its own state again on every update
+_state_memo = {}
+
+
+def state_signature(state_file: str):
+    st = os.stat(state_file)
+    return st.st_mtime_ns, st.st_size
+
+
+def load_state(state_file: str, params: tuple = None):
+    """Return the saved incremental state, or None if missing, unreadable or stale."""
+    memo = _state_memo.get(os.path.abspath(state_file))
+    try:
+        if memo and memo[0] == state_signature(state_file):
+            state = memo[1]
+        else:
+            with open(state_file, "rb") as f:
+                state = pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"[warn] Couldn't read state file '{state_file}': {e}. Doing a full recompute.")
+        return None
+    if state.get("params") != (params or state_params()):
+        print("[info] Scoring settings changed since the last run. Doing a full recompute.")
+        return None
+    return state
+
+
+def save_state(state_file: str, files: dict, final_points: dict, params: tuple = None, teams: dict = None):
+    """
+    Persist {fname: {"digest", "spec", "scores", "ranks"}} plus FinalPoints and the last {username: TeamId}
+    (the warm start of the constraint solver). Non-fatal on errors.
+    """
+    state = {"params": params or state_params(), "files": files, "final": final_points, "teams": teams}
+    tmp = f"{state_file}.tmp"
+    try:
+        with open(tmp, "wb") as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, state_file)
+        _state_memo[os.path.abspath(state_file)] = (state_signature(state_file), state)
+    except OSError as e:
+        print(f"[warn] Couldn't write state file '{state_file}': {e}")
+
+
+def apply_score_deltas(final_points: dict, old_scores: dict, new_scores: dict):
+    """
+    Update FinalPoints in place: subtract a file's old contribution, add its new one.
+    Users whose total drops to 0 are removed; a missing user counts as 0.
+    """
+    for username, pts in old_scores.items():
+        final_points[username] = final_points.get(username, 0) - pts
+        if final_points[username] == 0:
+            del final_points[username]
+    for username, pts in new_scores.items():
+        final_points[username] = final_points.get(username, 0) + pts
+
+
+# ---------- Aggregation ----------
+def build_points_matrix(all_scores: dict):
+    """
+    Columnar view of {file: {username: points}}: usernames are interned to integer ids
+    (row index) and points land in an int64 matrix of shape (users, contests).
+    Returns (usernames object array, file names list, matrix).
+    The cost is dominated by pd.factorize hashing every (user, contest) username once,
+    i.e. it grows with the number of entries, not just with the matrix size.
+    """
+    import numpy as np
+    import pandas as pd
+
+    file_names = list(all_scores.keys())
+    lengths = [len(all_scores[f]) for f in file_names]
+    total = sum(lengths)
+
+    users = np.empty(total, dtype=object)
+    points = np.empty(total, dtype=np.int64)
+    pos = 0
+    for fname, n in zip(file_names, lengths):
+        users[pos:pos + n] = list(all_scores[fname].keys())
+        points[pos:pos + n] = np.fromiter(all_scores[fname].values(), dtype=np.int64, count=n)
+        pos += n
+
+    ids, usernames = pd.factorize(users)
+    contest_idx = np.repeat(np.arange(len(file_names)), lengths)
+    matrix = np.zeros((len(usernames), len(file_names)), dtype=np.int64)
+    matrix[ids, contest_idx] = points
+    return np.asarray(usernames, dtype=object), file_names, matrix
+
+
+def counted_window(n_contests: int, mode: str, k: int = None, trim: float = None) -> tuple:
+    """[lo, hi): positions, in ascending order of a participant's points, that mode counts."""
+    if mode == "best":
+        return max(n_contests - (k or BEST_K or n_contests), 0), n_contests
+    if mode == "trimmed":
+        cut = int((TRIM_FRACTION if trim is None else trim) * n_contests)
+        return cut, n_contests - cut
+    if mode == "median":
+        return (n_contests - 1) // 2, n_contests // 2 + 1
+    return 0, n_contests
+
+
+def aggregate_points(points: np.ndarray, mode: str = None, k: int = None, trim: float = None) -> tuple:
+    """
+    FinalPoints of a (users, contests) points matrix under an AGGREGATIONS mode.
+    The counted contests of each row are found with one argpartition along the contest axis
+    (no full sort), so this stays O(users * contests). Returns (int64 FinalPoints, bool
+    matrix of the counted contests), the mask being None for "sum".
+    """
+    import numpy as np
+
+    mode = mode or AGGREGATION
+    if mode not in AGGREGATIONS:
+        raise ValueError(f"Unknown aggregation '{mode}'. Choose one of {AGGREGATIONS}.")
+    n_users, n_contests = points.shape
+    lo, hi = counted_window(n_contests, mode, k, trim)
+    if mode == "sum" or n_contests == 0 or (lo, hi) == (0, n_contests):
+        counted = None if mode == "sum" else np.ones(points.shape, dtype=bool)
+        total = points.sum(axis=1)
+    else:
+        # Positions lo and hi-1 end up in sorted place, so lo..hi-1 hold exactly the counted ranks
+        kth = [lo, hi - 1] if hi - 1 > lo else [lo]
+        idx = np.argpartition(points, kth, axis=1)[:, lo:hi]
+        total = np.take_along_axis(points, idx, axis=1).sum(axis=1)
+        counted = np.zeros(points.shape, dtype=bool)
+        np.put_along_axis(counted, idx, True, axis=1)
+    if mode in ("trimmed", "median"):
+        total = total / max(hi - lo, 1)
+    return np.rint(total).astype(np.int64), counted
+
+
+def counted_labels(counted: np.ndarray) -> list:
+    """Per row, the 1-based numbers of the counted contest columns: "1,3,4"."""
+    import numpy as np
+
+    numbers = np.array([str(j + 1) for j in range(counted.shape[1])], dtype=object)
+    return [",".join(numbers[row]) for row in counted]
+
+
+def build_participants_frame(all_scores: dict, final_points: dict = None, top: int = None, weights: dict = None,
+                             aggregation: dict = None, ratings: dict = None, rank_by: str = None):
+    """
+    Participants table: Username, one points column per file, FinalPoints, sorted by
+    FinalPoints desc then Username. Returns None when there are no participants.
+    weights: {fname: weight}; FinalPoints is then round(points matrix @ weight vector)
+    (final_points is ignored), while the per-file columns keep the unweighted points.
+    aggregation: {"mode", "k", "trim"} for aggregate_points. Modes other than "sum" (which
+    ignore final_points, like weights) add a Counted column after FinalPoints with the
+    numbers of the contest columns that made it into FinalPoints.
+    ratings: {username: rating} (see elo_ratings), written as a last Rating column; with
+    rank_by "rating" the rows are sorted (and cut to top) by Rating instead of FinalPoints.
+    top: keep only the first `top` rows; they are picked with a partial selection, so only
+    those rows (plus ties at the cut-off) get sorted.
+    """
+    import numpy as np
+    import pandas as pd
+
+    with PROFILER.stage("aggregate"):
+        usernames, file_names, matrix = build_points_matrix(all_scores)
+        if len(usernames) == 0:
+            return None
+
+        counted = None
+        if aggregation and aggregation.get("mode", AGGREGATION) != "sum":
+            weighted = matrix
+            if weights is not None:
+                weighted = matrix * np.array([weights.get(f, 1.0) for f in file_names], dtype=np.float64)
+            final, counted = aggregate_points(weighted, **aggregation)
+        elif weights is not None:
+            w = np.array([weights.get(f, 1.0) for f in file_names], dtype=np.float64)
+            final = np.rint(matrix @ w).astype(np.int64)
+        elif final_points is None:
+            final = matrix.sum(axis=1)
+        else:
+            final = np.fromiter((final_points.get(u, 0) for u in usernames), dtype=np.int64, count=len(usernames))
+
+        rating = None
+        if ratings is not None:
+            rating = np.rint(np.fromiter((ratings.get(u, RATING_INITIAL) for u in usernames),
+                                         dtype=np.float64, count=len(usernames))).astype(np.int64)
+
+    with PROFILER.stage("sort"):
+        key = rating if (rank_by or RANK_BY) == "rating" and rating is not None else final
+        rows = np.arange(len(usernames))
+        if top is not None and top < len(usernames):
+            # Everyone scoring at least the top-th highest key; ties at the cut-off are
+            # all kept here so the Username tiebreak below decides between them
+            cutoff = np.partition(key, len(key) - top)[len(key) - top]
+            rows = np.flatnonzero(key >= cutoff)
+            print(f"[info] Keeping the top {top} of {len(usernames)} participants.")
+
+        # Sort descending by FinalPoints (or Rating), tiebreak by Username for determinism
+        name_rank = np.empty(len(rows), dtype=np.int64)
+        name_rank[np.argsort(usernames[rows], kind="stable")] = np.arange(len(rows))
+        order = rows[np.lexsort((name_rank, -key[rows]))][:top]
+
+        participants_df = pd.DataFrame(matrix[order], columns=file_names)
+        participants_df.insert(0, "Username", usernames[order])
+        participants_df["FinalPoints"] = final[order]
+        if counted is not None:
+            participants_df["Counted"] = counted_labels(counted[order])
+        if rating is not None:
+            participants_df["Rating"] = rating[order]
+    return participants_df
+
+
+# ---------- Team formation ----------
+def snake_teams(n: int, n_teams: int) -> np.ndarray:
+    """Snake draft: 0, 1, .., T-1, T-1, .., 1, 0, 0, 1, .. over the sorted participants."""
+    import numpy as np
+
+    pos = np.arange(n)
+    rnd, idx = np.divmod(pos, n_teams)
+    return np.where(rnd % 2 == 0, idx, n_teams - 1 - idx)
+
+
+def greedy_teams(points: np.ndarray, team_size: int) -> np.ndarray:
+    """
+    Largest-first greedy (LPT): each participant, strongest first, joins the open team with
+    the smallest points sum, via a min-heap. Team sizes differ by at most one.
+    """
+    import numpy as np
+
+    n = len(points)
+    n_teams = -(-n // team_size)
+    base, extra = divmod(n, n_teams)
+    sizes = [0] * n_teams
+    big = 0  # teams that reached base + 1 members (only `extra` may)
+    heap = [(0, t) for t in range(n_teams)]
+    team = np.empty(n, dtype=np.int64)
+    for i in range(n):
+        while True:
+            total, t = heapq.heappop(heap)
+            cap = base + 1 if big < extra else base
+            if sizes[t] < cap:
+                break  # otherwise the team is full: drop it lazily
+        team[i] = t
+        sizes[t] += 1
+        if sizes[t] == base + 1:
+            big += 1
+        heapq.heappush(heap, (total + int(points[i]), t))
+    return team
+
+
+def kk_teams(points: np.ndarray, team_size: int, passes: int = LOCAL_SEARCH_PASSES) -> np.ndarray:
+    """
+    Karmarkar–Karp style partition with cardinality constraints: participants are taken in
+    rounds of one per team (strongest round first) and each round's largest value is paired
+    with the currently weakest team. The result is polished by pairwise-exchange local search:
+    every pass pairs the strongest teams with the weakest ones and, in each pair, makes the member
+    swap that lowers the sum of squared team totals the most (all pairs at once, vectorized).
+    O(n log T) for the rounds plus O(T log T + n k) per pass.
+    """
+    import numpy as np
+
+    n = len(points)
+    n_teams = -(-n // team_size)
+    points = np.asarray(points, dtype=np.float64)
+    sums = np.zeros(n_teams)
+    team = np.empty(n, dtype=np.int64)
+    for start in range(0, n, n_teams):
+        items = np.arange(start, min(start + n_teams, n))
+        weakest = np.argsort(sums, kind="stable")[:len(items)]
+        team[items] = weakest
+        sums[weakest] += points[items]
+
+    # members[t] = participant indices of team t, padded with -1 (values padded with NaN)
+    order = np.argsort(team, kind="stable")
+    counts = np.bincount(team, minlength=n_teams)
+    slot = np.arange(n) - (np.cumsum(counts) - counts)[team[order]]
+    members = np.full((n_teams, int(counts.max())), -1, dtype=np.int64)
+    members[team[order], slot] = order
+    values = np.where(members >= 0, points[members], np.nan)
+
+    half = n_teams // 2
+    stale = 0
+    for pass_no in range(passes if half else 0):
+        ranked = np.argsort(sums, kind="stable")
+        hi = ranked[::-1][:half]
+        lo = np.roll(ranked[:half], pass_no % half)  # vary the pairing between passes
+        diff = (sums[hi] - sums[lo])[:, None, None]
+        delta = values[hi][:, :, None] - values[lo][:, None, :]
+        # Moving delta points from hi to lo lowers the sum of squares iff 0 < delta < diff
+        with np.errstate(invalid="ignore"):
+            gain = np.where((delta > 0) & (delta < diff), delta * (diff - delta), 0.0)
+        gain = gain.reshape(half, -1)
+        best = gain.argmax(axis=1)
+        improved = gain[np.arange(half), best] > 0
+        if not improved.any():
+            stale += 1
+            if stale >= 3:
+                break
+            continue
+        stale = 0
+        ia, ib = np.divmod(best[improved], members.shape[1])
+        h, l = hi[improved], lo[improved]
+        moved = delta[improved, ia, ib]
+        members[h, ia], members[l, ib] = members[l, ib], members[h, ia].copy()
+        values[h, ia], values[l, ib] = values[l, ib], values[h, ia].copy()
+        sums[h] -= moved
+        sums[l] += moved
+
+    filled = members >= 0
+    team[members[filled]] = np.nonzero(filled)[0]
+    return team
+
+
+def assign_teams(points, team_size: int, strategy: str = None) -> np.ndarray:
+    """
+    1-based team id for every row of the sorted Participants table (points = FinalPoints
+    in that order). Teams are numbered by their strongest member, so team 1 holds the top scorer.
+    """
+    import numpy as np
+
+    strategy = strategy or TEAM_STRATEGY
+    if strategy not in TEAM_STRATEGIES:
+        raise ValueError(f"Unknown team strategy '{strategy}'. Choose one of {TEAM_STRATEGIES}.")
+    n = len(points)
+    if n == 0:
+        return np.zeros(0, dtype=np.int64)
+    n_teams = -(-n // team_size)
+
+    if strategy == "sequential":
+        return np.arange(n) // team_size + 1
+    if strategy == "snake":
+        team = snake_teams(n, n_teams)
+    elif strategy == "greedy":
+        team = greedy_teams(np.asarray(points), team_size)
+    else:
+        team = kk_teams(np.asarray(points), team_size)
+
+    return renumber_teams(team, n_teams)
+
+
+def renumber_teams(team: np.ndarray, n_teams: int) -> np.ndarray:
+    """0-based team per sorted row -> 1-based ids numbered by first appearance (strongest member)."""
+    import numpy as np
+
+    n = len(team)
+    first_seen = np.full(n_teams, n, dtype=np.int64)
+    np.minimum.at(first_seen, team, np.arange(n))
+    renumber = np.empty(n_teams, dtype=np.int64)
+    renumber[np.argsort(first_seen, kind="stable")] = np.arange(1, n_teams + 1)
+    return renumber[team]
+
+
+# ---------- Constraint solver ----------
+def load_constraints(path: str):
+    """
+    Read a team constraints JSON file, or None with a message if it is unusable:
+
+        {"must_pair": [["alice", "bob"]], "must_not_pair": [["carol", "dave"]],
+         "seniors": ["alice", "erin"], "max_seniors": 1,
+         "institutions": {"alice": "BUET", "bob": "DU"}, "max_per_institution": 2,
+         "institution_quotas": {"BUET": 1}}
+
+    Participants are named by their VJudge username, with or without the "(nickname)" part.
+    """
+    try:
+        with open(path, encoding="utf-8") as f:
+            constraints = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"❌ Couldn't read constraints file '{path}': {e}")
+        return None
+    if not isinstance(constraints, dict):
+        print(f"❌ Constraints file '{path}' must contain a JSON object.")
+        return None
+    unknown = set(constraints) - CONSTRAINT_KEYS
+    if unknown:
+        print(f"[warn] Ignoring unknown constraint keys: {', '.join(sorted(unknown))}")
+
+    def is_names(value):
+        return isinstance(value, list) and all(isinstance(name, str) for name in value)
+
+    def is_count(value):
+        return isinstance(value, int) and not isinstance(value, bool) and value >= 0
+
+    try:
+        for key in ("must_pair", "must_not_pair"):
+            groups = constraints.get(key, [])
+            if not isinstance(groups, list) or not all(is_names(group) for group in groups):
+                raise ValueError(f"{key} must be a list of username lists, e.g. [[\"alice\", \"bob\"]]")
+        if not is_names(constraints.get("seniors", [])):
+            raise ValueError("seniors must be a list of usernames")
+        institutions = constraints.get("institutions", {})
+        if not isinstance(institutions, dict) or not all(isinstance(v, str) for v in institutions.values()):
+            raise ValueError("institutions must be an object of username -> institution name")
+        quotas = constraints.get("institution_quotas", {})
+        if not isinstance(quotas, dict) or not all(is_count(v) for v in quotas.values()):
+            raise ValueError("institution_quotas must be an object of institution -> non-negative integer")
+        for key in ("max_seniors", "max_per_institution"):
+            if constraints.get(key) is not None and not is_count(constraints[key]):
+                raise ValueError(f"{key} must be a non-negative integer, got {constraints[key]!r}")
+    except ValueError as e:
+        print(f"❌ Constraints file '{path}': {e}")
+        return None
+    return constraints
+
+
+def compile_constraints(constraints: dict, usernames: list) -> dict:
+    """
+    Resolve names in constraints to row indices of the sorted Participants table:
+    must-pair groups (merged when they overlap), conflict sets, seniors and institution quotas.
+    """
+    lookup = {}
+    for i, username in enumerate(usernames):
+        lookup.setdefault(username.lower(), i)
+        lookup.setdefault(username.split("(", 1)[0].strip().lower(), i)
+    missing = []
+
+    def indices(names):
+        found = []
+        for name in names:
+            i = lookup.get(str(name).strip().lower())
+            if i is None:
+                missing.append(str(name))
+            else:
+                found.append(i)
+        return found
+
+    # must-pair lists may overlap: merge them with a union-find
+    parent = {}
+
+    def find(i):
+        while parent.setdefault(i, i) != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for group in constraints.get("must_pair", []):
+        found = indices(group)
+        for i in found[1:]:
+            parent[find(i)] = find(found[0])
+    groups = defaultdict(list)
+    for i in sorted(parent):
+        groups[find(i)].append(i)
+
+    conflicts = defaultdict(set)
+    for names in constraints.get("must_not_pair", []):
+        found = indices(names)
+        for i in found:
+            conflicts[i].update(j for j in found if j != i)
+
+    institutions = {}
+    for name, institution in constraints.get("institutions", {}).items():
+        for i in indices([name]):
+            institutions[i] = str(institution)
+    default_quota = constraints.get("max_per_institution")
+    quotas = {inst: constraints.get("institution_quotas", {}).get(inst, default_quota)
+              for inst in set(institutions.values())}
+
+    if missing:
+        shown = ", ".join(sorted(set(missing))[:5])
+        print(f"[warn] Constraints name {len(set(missing))} unknown participant(s): {shown}"
+              f"{', …' if len(set(missing)) > 5 else ''}")
+    return {
+        "groups": [g for g in groups.values() if len(g) > 1],
+        "conflicts": conflicts,
+        "seniors": set(indices(constraints.get("seniors", []))),
+        "max_seniors": constraints.get("max_seniors", 1),
+        "institutions": institutions,
+        "quotas": {inst: q for inst, q in quotas.items() if q is not None},
+    }
+
+
+def team_violations(members: list, c: dict) -> int:
+    """Number of broken constraints in one team (conflicting pairs, surplus seniors and institution members)."""
+    conflicts, seniors, institutions, quotas = c["conflicts"], c["seniors"], c["institutions"], c["quotas"]
+    count = 0
+    if conflicts:
+        for i in members:
+            if i in conflicts:
+                count += len(conflicts[i].intersection(members))
+        count //= 2
+    if seniors:
+        count += max(0, len(seniors.intersection(members)) - c["max_seniors"])
+    if quotas:
+        found = [institutions[i] for i in members if i in institutions]
+        if found:
+            for inst, k in Counter(found).items():
+                if inst in quotas and k > quotas[inst]:
+                    count += k - quotas[inst]
+    return count
+
+
+def solve_constrained_teams(points, usernames: list, team_size: int, constraints: dict, strategy: str = None,
+                            warm_start: dict = None, time_limit: float = SOLVER_TIME_LIMIT,
+                            max_iterations: int = SOLVER_ITERATIONS, seed: int = SOLVER_SEED) -> np.ndarray:
+    """
+    Like assign_teams, but honoring constraints (see load_constraints) while keeping team totals balanced.
+
+    Must-pair groups are placed whole and never split. Everyone else starts in their team from
+    `strategy`, or from warm_start ({username: TeamId} of the previous solve, for incremental
+    re-solves). A local search then swaps members between two teams when that lowers the
+    number of violations or, at equal violations, the sum of squared team totals. It stops
+    after max_iterations, time_limit seconds, or once no swap has helped for a while.
+    """
+    import numpy as np
+
+    n = len(points)
+    if n == 0:
+        return np.zeros(0, dtype=np.int64)
+    c = compile_constraints(constraints, usernames)
+    start_team = assign_teams(points, team_size, strategy) - 1
+    n_teams = int(start_team.max()) + 1
+    capacity = np.bincount(start_team, minlength=n_teams).tolist()
+    preferred = start_team.tolist()
+    if warm_start:
+        for i, username in enumerate(usernames):
+            t = warm_start.get(username)
+            if t is not None and 1 <= t <= n_teams:
+                preferred[i] = t - 1
+
+    points = [int(p) for p in points]
+    team = [-1] * n
+    members = [[] for _ in range(n_teams)]
+    sums = np.zeros(n_teams, dtype=np.int64)
+    pinned = set()
+
+    def place(i, t):
+        team[i] = t
+        members[t].append(i)
+        sums[t] += points[i]
+
+    # 1. must-pair groups, largest first: their preferred team, else the weakest team with room
+    for group in sorted(c["groups"], key=len, reverse=True):
+        t = preferred[group[0]]
+        if capacity[t] - len(members[t]) < len(group):
+            open_teams = [u for u in range(n_teams) if capacity[u] - len(members[u]) >= len(group)]
+            if not open_teams:
+                print(f"[warn] No team has room for must-pair group "
+                      f"{', '.join(usernames[i] for i in group)}. Placing them separately.")
+                continue
+            t = min(open_teams, key=lambda u: sums[u])
+        for i in group:
+            place(i, t)
+            pinned.add(i)
+
+    # 2. everyone else into their preferred team while it has room, then strongest first
+    #    into the weakest open team
+    rest = []
+    for i in range(n):
+        if team[i] < 0:
+            if len(members[preferred[i]]) < capacity[preferred[i]]:
+                place(i, preferred[i])
+            else:
+                rest.append(i)
+    heap = [(int(sums[t]), t) for t in range(n_teams) if len(members[t]) < capacity[t]]
+    heapq.heapify(heap)
+    for i in rest:
+        _, t = heapq.heappop(heap)
+        place(i, t)
+        if len(members[t]) < capacity[t]:
+            heapq.heappush(heap, (int(sums[t]), t))
+
+    # 3. local search over swaps of unpinned members. Violations among pinned members alone
+    #    (e.g. a must-pair group of two seniors) can't be repaired, so they don't make a team "bad"
+    violations = [team_violations(m, c) for m in members]
+    fixed = [team_violations([i for i in m if i in pinned], c) for m in members]
+    bad = {t for t in range(n_teams) if violations[t] > fixed[t]}
+    rng = random.Random(seed)
+    # Converged once a window of iterations repairs nothing and cuts the spread of team totals
+    # (sum of squared deviations from the mean) by less than 0.1%
+    window = 2 * n_teams + 500
+    spread = float(((sums - sums.mean()) ** 2).sum())
+    checkpoint = (len(bad), spread)
+    start = time.perf_counter()
+    iterations = 0
+    for iterations in range(1, max_iterations + 1):
+        if n_teams < 2 or (iterations % 256 == 0 and time.perf_counter() - start > time_limit):
+            break
+        if iterations % window == 0:
+            if len(bad) >= checkpoint[0] and spread > checkpoint[1] * 0.999:
+                break
+            checkpoint = (len(bad), spread)
+        # Alternate repair moves (from a bad team) with balancing moves (strongest and weakest
+        # team now and then, random pairs otherwise)
+        if bad and iterations % 2:
+            a = rng.choice(tuple(bad))
+            b = rng.randrange(n_teams - 1)
+            b += b >= a
+        elif iterations % 8 == 0:
+            a, b = int(sums.argmax()), int(sums.argmin())
+        else:
+            a, b = rng.sample(range(n_teams), 2)
+        if a == b:
+            continue
+
+        best, best_key = None, (0, 0)
+        diff = int(sums[a] - sums[b])
+        repairable = a in bad or b in bad
+        for x_pos, x in enumerate(members[a]):
+            if x in pinned:
+                continue
+            for y_pos, y in enumerate(members[b]):
+                if y in pinned:
+                    continue
+                d = points[x] - points[y]
+                balance = d * (d - diff)  # change in (sum of squares) / 2
+                if not repairable and balance >= best_key[1]:
+                    continue  # violations can only stay or grow, so this swap can't win
+                new_a = members[a][:x_pos] + [y] + members[a][x_pos + 1:]
+                new_b = members[b][:y_pos] + [x] + members[b][y_pos + 1:]
+                dv = team_violations(new_a, c) + team_violations(new_b, c) - violations[a] - violations[b]
+                key = (dv, balance)
+                if key < best_key:
+                    best, best_key = (x_pos, y_pos, new_a, new_b), key
+        if best is None:
+            continue
+
+        spread += 2 * best_key[1]
+        x_pos, y_pos, members[a], members[b] = best
+        y, x = members[a][x_pos], members[b][y_pos]
+        team[x], team[y] = b, a
+        moved = points[x] - points[y]
+        sums[a] -= moved
+        sums[b] += moved
+        for t in (a, b):
+            violations[t] = team_violations(members[t], c)
+            if violations[t] > fixed[t]:
+                bad.add(t)
+            else:
+                bad.discard(t)
+
+    left, unfixable = sum(violations), sum(fixed)
+    print(f"[info] Constraint solver: {iterations} iterations in {time.perf_counter() - start:.2f}s, "
+          f"{left} violation(s) left.")
+    if unfixable:
+        print(f"[warn] {unfixable} violation(s) are inside must-pair groups and can't be fixed.")
+    if left > unfixable:
+        print(f"[warn] Couldn't satisfy every constraint; {len(bad)} team(s) still break one.")
+    return renumber_teams(np.array(team, dtype=np.int64), n_teams)
+
+
+# ---------- Output ----------
+def build_teams_long(participants_df: pd.DataFrame, teams: np.ndarray) -> pd.DataFrame:
+    """All teams in one frame: the Participants rows with a leading TeamId column, grouped by team."""
+    import numpy as np
+
+    order = np.argsort(teams, kind="stable")
+    teams_df = participants_df.iloc[order].reset_index(drop=True)
+    teams_df.insert(0, "TeamId", teams[order])
+    return teams_df
+
+
+def build_teams_wide(participants_df: pd.DataFrame, teams: np.ndarray) -> pd.DataFrame:
+    """
+    One row per team: TeamId, Member_1..Member_k, the team's summed FinalPoints and, with a
+    Rating column, the members' mean TeamRating.
+    """
+    import numpy as np
+    import pandas as pd
+
+    order = np.argsort(teams, kind="stable")
+    team_of = teams[order]
+    n_teams = int(team_of[-1]) if len(team_of) else 0
+    counts = np.bincount(team_of, minlength=n_teams + 1)[1:]
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    slot = np.arange(len(order)) - starts[team_of - 1]
+    width = int(counts.max()) if len(counts) else 0
+
+    members = np.full((n_teams, width), None, dtype=object)
+    members[team_of - 1, slot] = participants_df["Username"].to_numpy(dtype=object)[order]
+    teams_df = pd.DataFrame(members, columns=[f"Member_{k}" for k in range(1, width + 1)])
+    teams_df.insert(0, "TeamId", np.arange(1, n_teams + 1))
+    points = participants_df["FinalPoints"].to_numpy()[order]
+    teams_df["TeamPoints"] = np.bincount(team_of, weights=points, minlength=n_teams + 1)[1:].astype(np.int64)
+    if "Rating" in participants_df.columns:
+        rating = participants_df["Rating"].to_numpy()[order]
+        sums = np.bincount(team_of, weights=rating, minlength=n_teams + 1)[1:]
+        teams_df["TeamRating"] = np.rint(sums / np.maximum(counts, 1)).astype(np.int64)
+    return teams_df
+
+
+def iter_output_sheets(participants_df: pd.DataFrame, teams: np.ndarray, layout: str = None):
+    """
+    Yield (sheet_name, DataFrame): the Participants sheet, then the team sheet(s) for layout.
+    teams: 1-based team id per Participants row (see assign_teams).
+    """
+    layout = layout or TEAM_LAYOUT
+    if layout not in TEAM_LAYOUTS:
+        raise ValueError(f"Unknown team layout '{layout}'. Choose one of {TEAM_LAYOUTS}.")
+
+    import numpy as np
+
+    yield "Participants", participants_df
+    if layout == "long":
+        yield "Teams", build_teams_long(participants_df, teams)
+    elif layout == "wide":
+        yield "Teams", build_teams_wide(participants_df, teams)
+    else:
+        # One sheet per team, members in ranking order
+        teams_df = build_teams_long(participants_df, teams).drop(columns="TeamId")
+        counts = np.bincount(teams)[1:]
+        for i, (start, stop) in enumerate(zip(np.cumsum(counts) - counts, np.cumsum(counts)), start=1):
+            yield f"Team_{i}", teams_df.iloc[start:stop].reset_index(drop=True)
+
+
+def build_assignments_frame(participants_df: pd.DataFrame, teams: np.ndarray) -> pd.DataFrame:
+    """
+    Typed Participants table for columnar outputs: Username (string), one int64 points
+    column per contest, FinalPoints (int64), Counted (string) and Rating (int64) if present,
+    and TeamId (int64).
+    """
+    df = participants_df.copy()
+    for col in df.columns:
+        df[col] = df[col].astype("string" if col in ("Username", "Counted") else "int64")
+    df["TeamId"] = teams.astype("int64")
+    return df
+
+
+def table_output_path(out_file: str, table: str, fmt: str) -> str:
+    """final_teams.xlsx + ("participants", "parquet") -> final_teams_participants.parquet"""
+    return f"{os.path.splitext(out_file)[0]}_{table}.{fmt}"
+
+
+def write_tables(out_file: str, tables: dict, formats):
+    """
+    Write {table name: DataFrame} in each non-Excel format of formats. Non-fatal per format:
+    a failing table is reported and the rest of that format is skipped.
+    """
+    for fmt in formats:
+        if fmt == "xlsx":
+            continue
+        if fmt not in OUTPUT_FORMATS:
+            raise ValueError(f"Unknown output format '{fmt}'. Choose from {OUTPUT_FORMATS}.")
+        for table, df in tables.items():
+            path = table_output_path(out_file, table, fmt)
+            try:
+                if fmt == "parquet":
+                    df.to_parquet(path, index=False, engine="pyarrow")
+                elif fmt == "feather":
+                    df.reset_index(drop=True).to_feather(path)
+                else:
+                    df.to_csv(path, index=False)
+            except ImportError as e:
+                print(f"[warn] Skipping {fmt} output: {e}. Install pyarrow for Parquet/Feather.")
+                break
+            except Exception as e:
+                print(f"❌ Error writing {fmt} output '{path}': {e}. Skipping {fmt} output.")
+                break
+            print(f"[ok] Saved {table} table to '{path}'")
+
+
+def frame_rows(df: pd.DataFrame):
+    """Header + data rows of df as plain Python values (what to_excel would write)."""
+    yield [str(c) for c in df.columns]
+    yield from df.to_numpy(dtype=object).tolist()
+
+
+def resolve_write_engine(engine: str, n_rows: int) -> str:
+    """Pick the concrete writer for engine ("auto" streams large outputs)."""
+    engine = engine or WRITE_ENGINE
+    if engine not in WRITE_ENGINES:
+        raise ValueError(f"Unknown write engine '{engine}'. Choose one of {WRITE_ENGINES}.")
+    if engine == "auto":
+        return "write_only" if n_rows > LARGE_OUTPUT_ROWS else "pandas"
+    if engine == "xlsxwriter":
+        try:
+            import xlsxwriter  # noqa: F401
+        except ImportError:
+            print("[warn] xlsxwriter is not installed. Falling back to the openpyxl write_only engine.")
+            return "write_only"
+    return engine
+
+
+def write_sheets(out_file: str, sheets, engine: str = "pandas"):
+    """Write (sheet_name, DataFrame) pairs to out_file with the given concrete engine."""
+    import pandas as pd
+
+    if engine == "pandas":
+        with pd.ExcelWriter(out_file, engine="openpyxl") as writer:
+            for sheet_name, df in sheets:
+                df.to_excel(writer, sheet_name=sheet_name, index=False)
+                print(f"[ok] Saved {sheet_name} to '{out_file}'")
+
+    elif engine == "write_only":
+        from openpyxl import Workbook
+
+        wb = Workbook(write_only=True)
+        for sheet_name, df in sheets:
+            ws = wb.create_sheet(sheet_name)
+            for row in frame_rows(df):
+                ws.append(row)
             print(f"[ok] Saved {sheet_name} to '{out_file}'")
+        wb.save(out_file)
+
+    elif engine == "xlsxwriter":
+        import xlsxwriter
 
+        wb = xlsxwriter.Workbook(out_file, {"constant_memory": True})
+        try:
+            for sheet_name, df in sheets:
+                ws = wb.add_worksheet(sheet_name)
+                for r, row in enumerate(frame_rows(df)):
+                    ws.write_row(r, 0, row)
+                print(f"[ok] Saved {sheet_name} to '{out_file}'")
+        finally:
+            wb.close()
 
-def main():
-    # Optionally install requirements
-    safe_install_requirements(REQUIREMENTS_FILE)
+    else:
+        raise ValueError(f"Unknown write engine '{engine}'.")
 
-    # Check leaderboards directory
-    if not os.path.isdir(LEADERBOARDS_DIR):
-        print(f"❌ Leaderboards directory '{LEADERBOARDS_DIR}' not found. Please create it and put contest .xlsx files inside.")
-        return
 
-    # Accept both .xlsx and .xls
-    files = [f for f in os.listdir(LEADERBOARDS_DIR) if f.lower().endswith((".xlsx", ".xls"))]
-    if not files:
-        print(f"❌ No Excel files (.xlsx/.xls) found in '{LEADERBOARDS_DIR}' directory. Exiting.")
-        return
+def write_participants_and_teams_to_excel(all_scores: dict, team_size: int, out_file: str = OUT_FILE,
+                                          final_points: dict = None, engine: str = None, layout: str = None,
+                                          formats=(OUTPUT_FORMAT,), strategy: str = None,
+                                          constraints: dict = None, warm_start: dict = None, solver_budget: dict = None,
+                                          top_teams: int = None, weights: dict = None, aggregation: dict = None,
+                                          ratings: dict = None, rank_by: str = None):
+    """
+    Write participants with their scores for each file and calculate the FinalPoints.
+    final_points: precomputed {username: FinalPoints} (incremental mode); summed from all_scores if None.
+    engine: Excel writer, see WRITE_ENGINE. layout: team sheet layout, see TEAM_LAYOUT.
+    formats: any of OUTPUT_FORMATS; non-Excel formats are written next to out_file.
+    strategy: how members are grouped into teams, see TEAM_STRATEGY.
+    constraints: team constraints (see load_constraints), solved starting from warm_start
+    ({username: TeamId}) with solver_budget ({"time_limit", "max_iterations"}) if given.
+    top_teams: keep only the strongest top_teams * team_size participants and their teams.
+    weights: per-file weights of FinalPoints, see contest_weights.
+    aggregation: {"mode", "k", "trim"}, how per-file points add up, see AGGREGATION.
+    ratings: {username: rating} for a Rating column; rank_by "rating" ranks and forms the
+    teams by it instead of FinalPoints (see RANK_BY).
+    Returns the assignment as {username: TeamId}.
+    """
+    top = top_teams * team_size if top_teams else None
+    participants_df = build_participants_frame(all_scores, final_points, top, weights, aggregation,
+                                               ratings, rank_by)
+    if participants_df is None:
+        print("[warn] No participant data to write.")
+        return None
 
-    # Ask for team size (robust)
+    with PROFILER.stage("teams"):
+        points = participants_df["Rating" if "Rating" in participants_df.columns and rank_by == "rating"
+                                 else "FinalPoints"].to_numpy()
+        if constraints:
+            teams = solve_constrained_teams(points, participants_df["Username"].tolist(), team_size, constraints,
+                                            strategy, warm_start, **(solver_budget or {}))
+        else:
+            teams = assign_teams(points, team_size, strategy)
+
+    with PROFILER.stage("write"):
+        # Write to Excel with teams
+        if "xlsx" in formats:
+            engine = resolve_write_engine(engine, len(participants_df))
+            write_sheets(out_file, iter_output_sheets(participants_df, teams, layout), engine)
+        if any(fmt != "xlsx" for fmt in formats):
+            teams_df = build_teams_wide(participants_df, teams)
+            for col in teams_df.columns:
+                if col.startswith("Member_"):
+                    teams_df[col] = teams_df[col].astype("string")
+            tables = {"participants": build_assignments_frame(participants_df, teams), "teams": teams_df}
+            write_tables(out_file, tables, formats)
+    return dict(zip(participants_df["Username"].tolist(), teams.tolist()))
+
+
+def positive_int(value: str) -> int:
+    """argparse type for integers >= 1."""
+    try:
+        number = int(value)
+    except ValueError:
+        number = 0
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"expected a positive integer, got '{value}'")
+    return number
+
+
+def output_formats(value: str) -> tuple:
+    """argparse type for a comma-separated list of OUTPUT_FORMATS."""
+    formats = tuple(dict.fromkeys(f.strip().lower() for f in value.split(",") if f.strip()))
+    unknown = [f for f in formats if f not in OUTPUT_FORMATS]
+    if unknown or not formats:
+        raise argparse.ArgumentTypeError(f"choose from {', '.join(OUTPUT_FORMATS)} (comma-separated), got '{value}'")
+    return formats
+
+
+def parse_args(argv=None):
+    """
+    Parse command-line options. args.interactive is True when no options were given and
+    stdin is a terminal, i.e. when main() should prompt for the team size.
+    """
+    parser = argparse.ArgumentParser(description="Form teams from VJudge contest standings exports.")
+    parser.add_argument("--team-size", "-t", type=positive_int,
+                        help=f"members per team (default {DEFAULT_TEAM_SIZE}; prompted for when run "
+                             "interactively without options)")
+    parser.add_argument("--leaderboards", "-l", default=LEADERBOARDS_DIR, metavar="DIR",
+                        help=f"directory with the contest standings files (default '{LEADERBOARDS_DIR}')")
+    parser.add_argument("--output", "-o", default=OUT_FILE, metavar="PATH",
+                        help=f"output workbook (default '{OUT_FILE}')")
+    parser.add_argument("--output-format", type=output_formats, default=(OUTPUT_FORMAT,), metavar="FMT[,FMT...]",
+                        help=f"any of {', '.join(OUTPUT_FORMATS)}; non-xlsx formats write "
+                             "<output stem>_participants.<fmt> and <output stem>_teams.<fmt> (default xlsx)")
+    parser.add_argument("--points-numerator", type=int, default=POINTS_NUMERATOR,
+                        help=f"points = ceil(NUMERATOR / (rank + OFFSET)) (default {POINTS_NUMERATOR})")
+    parser.add_argument("--points-offset", type=int, default=POINTS_OFFSET,
+                        help=f"see --points-numerator (default {POINTS_OFFSET})")
+    parser.add_argument("--points-formula", choices=POINTS_FORMULAS, default=POINTS_FORMULA,
+                        help=f"points per file: a rank formula, or 'problems' for solves minus penalty "
+                             f"from the per-problem cells (default {POINTS_FORMULA})")
+    parser.add_argument("--scoring-config", metavar="FILE",
+                        help="JSON file choosing the formula, its parameters and a weight per contest file (see README)")
+    parser.add_argument("--half-life", type=float, metavar="DAYS",
+                        help="time decay: a contest DAYS older than the newest one counts half "
+                             "(dates from the scoring config or the file names)")
+    parser.add_argument("--aggregation", choices=AGGREGATIONS,
+                        help=f"how per-contest points add up to FinalPoints: sum, best K contests, trimmed "
+                             f"mean or median (default {AGGREGATION}, or best with --best-k)")
+    parser.add_argument("--best-k", type=positive_int, default=BEST_K, metavar="K",
+                        help="count only each participant's best K contests")
+    parser.add_argument("--trim", type=float, default=TRIM_FRACTION, metavar="FRACTION",
+                        help=f"share of contests dropped at each end by --aggregation trimmed (default {TRIM_FRACTION:g})")
+    parser.add_argument("--ratings", action="store_true",
+                        help="add an Elo Rating column computed over the contests in date order")
+    parser.add_argument("--rank-by", choices=RANK_BY_CHOICES, default=RANK_BY,
+                        help=f"column that orders the participants and forms the teams; "
+                             f"'rating' implies --ratings (default {RANK_BY})")
+    parser.add_argument("--rating-k", type=float, default=RATING_K, metavar="K",
+                        help=f"Elo K-factor: the most a rating moves in one contest (default {RATING_K})")
+    parser.add_argument("--jobs", "-j", type=positive_int, default=1,
+                        help="parse leaderboard files in N worker processes (default 1)")
+    parser.add_argument("--engine", choices=READ_ENGINES, default=READ_ENGINE,
+                        help=f"Excel reader engine (default {READ_ENGINE}); CSV/TSV/Parquet use native readers")
+    parser.add_argument("--write-engine", choices=WRITE_ENGINES, default=WRITE_ENGINE,
+                        help=f"Excel writer engine (default {WRITE_ENGINE}: streaming for large outputs)")
+    parser.add_argument("--top-teams", type=positive_int, metavar="K",
+                        help="only rank the strongest K x team-size participants and write their K teams")
+    parser.add_argument("--constraints", metavar="FILE",
+                        help="JSON file with must-pair / must-not-pair lists, seniors and institution quotas "
+                             "for the team assignment (see README)")
+    parser.add_argument("--solver-time-limit", type=float, default=SOLVER_TIME_LIMIT, metavar="SECONDS",
+                        help=f"time budget of the constraint solver (default {SOLVER_TIME_LIMIT:g})")
+    parser.add_argument("--solver-iterations", type=positive_int, default=SOLVER_ITERATIONS, metavar="N",
+                        help=f"iteration budget of the constraint solver (default {SOLVER_ITERATIONS})")
+    parser.add_argument("--team-layout", choices=TEAM_LAYOUTS, default=TEAM_LAYOUT,
+                        help=f"teams output: one long Teams sheet, one wide Teams sheet, "
+                             f"or a sheet per team (default {TEAM_LAYOUT})")
+    parser.add_argument("--team-strategy", choices=TEAM_STRATEGIES, default=TEAM_STRATEGY,
+                        help=f"team formation: consecutive ranks, snake draft, greedy min-sum or "
+                             f"Karmarkar–Karp + local search (default {TEAM_STRATEGY})")
+    parser.add_argument("--no-cache", action="store_true",
+                        help=f"don't read or write the parsed-standings cache ('{CACHE_DIR}')")
+    parser.add_argument("--clear-cache", action="store_true",
+                        help="delete the parsed-standings cache before running")
+    parser.add_argument("--incremental", action="store_true",
+                        help=f"reuse the previous run's per-file points ('{STATE_FILE}') "
+                             "and only parse new or changed files")
+    parser.add_argument("--state-file", default=STATE_FILE, metavar="PATH",
+                        help=f"state file for --incremental (default '{STATE_FILE}')")
+    parser.add_argument("--batch", metavar="GLOB_OR_MANIFEST",
+                        help="run every cohort: a glob of leaderboard directories, or a manifest file "
+                             "with one 'DIR [OUTPUT]' per line. --jobs then runs cohorts in parallel")
+    parser.add_argument("--batch-output-dir", default=".", metavar="DIR",
+                        help="where batch mode writes '<cohort>_final_teams.xlsx' (default: current dir)")
+    parser.add_argument("--watch", action="store_true",
+                        help="stay resident and re-rank incrementally whenever the leaderboards directory changes")
+    parser.add_argument("--watch-interval", type=float, default=WATCH_INTERVAL, metavar="SECONDS",
+                        help=f"--watch polling interval (default {WATCH_INTERVAL})")
+    parser.add_argument("--watch-debounce", type=float, default=WATCH_DEBOUNCE, metavar="SECONDS",
+                        help=f"wait until the directory is quiet this long before re-ranking (default {WATCH_DEBOUNCE})")
+    parser.add_argument("--install-deps", action="store_true",
+                        help=f"pip-install missing dependencies (from {REQUIREMENTS_FILE}) before running")
+    parser.add_argument("--profile", action="store_true",
+                        help="print wall/CPU time and peak memory per stage and per file at the end")
+    parser.add_argument("--profile-tracemalloc", action="store_true",
+                        help="with --profile, also record tracemalloc peaks (slows the run down)")
+    parser.add_argument("--profile-json", metavar="PATH",
+                        help="write the --profile table as JSON to PATH (implies --profile)")
+    parser.add_argument("--profile-stats", metavar="PATH",
+                        help="run under cProfile and dump the stats to PATH (view with pstats/snakeviz)")
+
+    raw_args = sys.argv[1:] if argv is None else argv
+    args = parser.parse_args(argv)
+    if args.watch and args.batch:
+        parser.error("--watch can't be combined with --batch")
+    if args.aggregation is None:
+        args.aggregation = "best" if args.best_k else AGGREGATION
+    if args.aggregation == "best" and not args.best_k:
+        parser.error("--aggregation best needs --best-k K")
+    if args.half_life is not None and not args.half_life > 0:
+        parser.error(f"--half-life must be a positive number of days, got {args.half_life:g}")
+    if not 0 <= args.trim < 0.5:
+        parser.error(f"--trim must be in [0, 0.5), got {args.trim:g}")
+    if args.rank_by == "rating":
+        args.ratings = True
+    args.interactive = not raw_args and sys.stdin is not None and sys.stdin.isatty()
+    return args
+
+
+def prompt_team_size() -> int:
+    """Ask for the team size on stdin (robust): anything invalid falls back to DEFAULT_TEAM_SIZE."""
     try:
         print()
-        team_size_input = input("👥 Enter team size (default 3): ").strip()
-        team_size = int(team_size_input) if team_size_input else 3
+        team_size_input = input(f"👥 Enter team size (default {DEFAULT_TEAM_SIZE}): ").strip()
+        team_size = int(team_size_input) if team_size_input else DEFAULT_TEAM_SIZE
         if team_size <= 0:
             raise ValueError
     except Exception:
-        print("[warn] Invalid team size provided. Defaulting to 3.")
-        team_size = 3
+        print(f"[warn] Invalid team size provided. Defaulting to {DEFAULT_TEAM_SIZE}.")
+        team_size = DEFAULT_TEAM_SIZE
+    return team_size
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.profile or args.profile_json or args.profile_tracemalloc:
+        PROFILER.enable(trace_memory=args.profile_tracemalloc)
+    profiler = None
+    if args.profile_stats:
+        import cProfile
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+    try:
+        if args.clear_cache:
+            cache_clear(CACHE_DIR)
+        # Dependencies are only installed on request; otherwise a cached import check
+        if not check_dependencies(install=args.install_deps):
+            return
+        if args.batch:
+            run_batch(args)
+        elif args.watch:
+            watch(args)
+        else:
+            run(args)
+    finally:
+        if profiler:
+            profiler.disable()
+            profiler.dump_stats(args.profile_stats)
+            print(f"[ok] Saved cProfile stats to '{args.profile_stats}'")
+        if PROFILER.enabled:
+            print("\n⏱️  Profile:")
+            print(PROFILER.summary())
+            if args.profile_json:
+                PROFILER.dump_json(args.profile_json)
+                print(f"[ok] Saved profile to '{args.profile_json}'")
+
+
+def list_standings_files(leaderboards_dir: str) -> list:
+    """Standings files in leaderboards_dir, sorted so results don't depend on directory order."""
+    return sorted(f for f in os.listdir(leaderboards_dir) if f.lower().endswith(STANDINGS_EXTENSIONS))
+
+
+def run(args):
+    """The ranking pipeline for parsed command-line args (one cohort)."""
+    cache_dir = None if args.no_cache else CACHE_DIR
+
+    leaderboards_dir, out_file = args.leaderboards, args.output
+    numerator, offset = args.points_numerator, args.points_offset
+    params = state_params(numerator, offset)
+
+    # Check leaderboards directory
+    if not os.path.isdir(leaderboards_dir):
+        print(f"❌ Leaderboards directory '{leaderboards_dir}' not found. Please create it and put contest .xlsx files inside.")
+        return
+
+    # Every STANDINGS_EXTENSIONS file (Excel, CSV/TSV, Parquet); sorted so results don't depend on directory order
+    with PROFILER.stage("discover"):
+        files = list_standings_files(leaderboards_dir)
+    if not files:
+        print(f"❌ No standings files ({'/'.join(STANDINGS_EXTENSIONS)}) found in '{leaderboards_dir}' directory. Exiting.")
+        return
+
+    scoring_config = None
+    if args.scoring_config:
+        scoring_config = load_scoring_config(args.scoring_config)
+        if scoring_config is None:
+            return
+    specs = {fname: contest_scoring(fname, scoring_config, args.points_formula) for fname in files}
+    for fname, spec in specs.items():
+        try:
+            check_scoring_spec(spec)
+        except (TypeError, ValueError, ArithmeticError) as e:
+            print(f"❌ Scoring config '{args.scoring_config}', file '{fname}': {e}")
+            return
+    half_life = args.half_life
+    if half_life is None:
+        half_life = (scoring_config or {}).get("half_life_days", HALF_LIFE_DAYS)
+    weights = contest_weights(specs, half_life)
+    if weights:
+        print("[info] Contest weights: " + ", ".join(f"{f}={w:.3g}" for f, w in weights.items()))
+
+    constraints = None
+    if args.constraints:
+        constraints = load_constraints(args.constraints)
+        if constraints is None:
+            return
+
+    # Ask for team size only in an interactive session without options
+    if args.team_size:
+        team_size = args.team_size
+    elif args.interactive:
+        team_size = prompt_team_size()
+    else:
+        team_size = DEFAULT_TEAM_SIZE
 
     all_scores = defaultdict(dict)
     any_scores = False
 
-    for fname in files:
-        path = os.path.join(LEADERBOARDS_DIR, fname)
-        print(f"\n📡 Processing: {path}")
-        standings = read_excel_file(path)
-        if not standings:
-            print(f"[warn] No valid standings in {fname}. Skipping.")
-            continue
+    # Incremental mode: reuse contributions of files whose contents haven't changed
+    state = load_state(args.state_file, params) if args.incremental else None
+    prev_files = state["files"] if state else {}
+    final_points = dict(state["final"]) if state else {}
+    digests = {}
+    if args.incremental:
+        for fname in files:
+            try:
+                digests[fname] = file_digest(os.path.join(leaderboards_dir, fname))
+            except OSError:
+                digests[fname] = None
+    unchanged = {f for f in files if f in prev_files and digests.get(f) and prev_files[f]["digest"] == digests[f]
+                 and prev_files[f].get("spec") == scoring_spec(specs[f])}
+    for fname in sorted(set(prev_files) - set(files)):
+        print(f"\n[info] {fname} was removed since the last run. Subtracting its points.")
+        apply_score_deltas(final_points, prev_files[fname]["scores"], {})
+
+    new_files = {}
+    to_parse = [f for f in files if f not in unchanged]
+    paths = [os.path.join(leaderboards_dir, fname) for fname in to_parse]
+    with PROFILER.stage("parse"):
+        problems = {path for fname, path in zip(to_parse, paths) if specs[fname]["formula"] == "problems"}
+        parsed = dict(zip(to_parse, load_all_standings(paths, args.jobs, args.engine, cache_dir, problems)))
+    for fname, (_, _, _, _, stats) in parsed.items():
+        PROFILER.record(f"  parse {fname}", **stats)
 
-        any_scores = True
-        for username, rank in standings:
-            pts = points_for_rank(rank)
-            # If a user appears multiple times within a file (unlikely), keep best / or sum — here we keep the maximum for that file
-            prev = all_scores[fname].get(username, 0)
-            all_scores[fname][username] = max(prev, pts)
+    with PROFILER.stage("score"):
+        for fname in files:
+            if fname in unchanged:
+                scores = prev_files[fname]["scores"]
+                new_files[fname] = prev_files[fname]
+                if scores:
+                    all_scores[fname] = scores
+                    any_scores = True
+                print(f"\n♻️  Unchanged since last run: {fname}")
+                continue
 
-        print(f"[info] Processed {len(standings)} rows from {fname}.")
+            path, standings, table, log, _ = parsed[fname]
+            print(f"\n📡 Processing: {path}")
+            print(log, end="")
+            if table is not None and not table["problems"] and standings:
+                print(f"[warn] No per-problem columns in {fname}. Scoring it by rank.")
+            with PROFILER.stage(f"  score {fname}", nested=True):
+                if table is not None and table["problems"]:
+                    scores = score_problems(table)
+                else:
+                    scores = score_standings(standings, numerator, offset, specs[fname])
+            old_scores = prev_files.get(fname, {}).get("scores", {})
+            apply_score_deltas(final_points, old_scores, scores)
+            new_files[fname] = {"digest": digests.get(fname), "spec": scoring_spec(specs[fname]), "scores": scores,
+                                "ranks": best_ranks(standings or [])}
+            if not standings:
+                print(f"[warn] No valid standings in {fname}. Skipping.")
+                continue
+
+            any_scores = True
+            all_scores[fname] = scores
+            print(f"[info] Processed {len(standings)} rows from {fname}.")
 
     if not any_scores:
+        if args.incremental:
+            save_state(args.state_file, new_files, final_points, params)
         print("❌ No points computed from any files. Exiting.")
         return
 
-    write_participants_and_teams_to_excel(all_scores, team_size, out_file=OUT_FILE)
-    print("\n✅ Done. Output saved to:", OUT_FILE)
+    ratings = None
+    if args.ratings:
+        with PROFILER.stage("rate"):
+            contests = [(new_files[f]["ranks"], specs[f].get("weight", 1))
+                        for f in rating_order(specs) if new_files[f]["ranks"]]
+            ratings = elo_ratings(contests, args.rating_k)
+        print(f"\n[info] Rated {len(ratings)} participants over {len(contests)} contests.")
+
+    # The constraint solver re-solves from the previous assignment in incremental mode
+    teams = write_participants_and_teams_to_excel(
+        all_scores, team_size, out_file=out_file, final_points=final_points if args.incremental else None,
+        engine=args.write_engine, layout=args.team_layout, formats=args.output_format, strategy=args.team_strategy,
+        constraints=constraints, warm_start=state.get("teams") if state else None,
+        solver_budget={"time_limit": args.solver_time_limit, "max_iterations": args.solver_iterations},
+        top_teams=args.top_teams, weights=weights,
+        aggregation={"mode": args.aggregation, "k": args.best_k, "trim": args.trim},
+        ratings=ratings, rank_by=args.rank_by)
+    if args.incremental:
+        save_state(args.state_file, new_files, final_points, params, teams)
+    if "xlsx" in args.output_format:
+        print("\n✅ Done. Output saved to:", out_file)
+    else:
+        print("\n✅ Done. Tables saved to:", table_output_path(out_file, "*", "{" + ",".join(args.output_format) + "}"))
+
+
+# ---------- Watch mode ----------
+def dir_snapshot(leaderboards_dir: str) -> dict:
+    """{file name: (mtime_ns, size)} of the standings files; {} if the directory is missing."""
+    snapshot = {}
+    try:
+        entries = list(os.scandir(leaderboards_dir))
+    except OSError:
+        return snapshot
+    for entry in entries:
+        if entry.name.lower().endswith(STANDINGS_EXTENSIONS):
+            try:
+                st = entry.stat()
+            except OSError:
+                continue
+            snapshot[entry.name] = (st.st_mtime_ns, st.st_size)
+    return snapshot
+
+
+def describe_changes(before: dict, after: dict) -> str:
+    added = sorted(set(after) - set(before))
+    removed = sorted(set(before) - set(after))
+    modified = sorted(f for f in set(before) & set(after) if before[f] != after[f])
+    parts = [f"{label}: {', '.join(names)}" for label, names in
+             (("added", added), ("modified", modified), ("removed", removed)) if names]
+    return "; ".join(parts)
+
+
+def watch(args):
+    """
+    Re-rank incrementally whenever the leaderboards directory changes. The process stays
+    resident, so imports and the incremental state stay warm between updates.
+    """
+    args.incremental = True
+    args.interactive = False
+    if not args.team_size:
+        args.team_size = DEFAULT_TEAM_SIZE
+
+    run(args)
+    snapshot = dir_snapshot(args.leaderboards)
+    print(f"\n👀 Watching '{args.leaderboards}' for changes (Ctrl+C to stop)...")
+    try:
+        while True:
+            time.sleep(args.watch_interval)
+            current = dir_snapshot(args.leaderboards)
+            if current == snapshot:
+                continue
+
+            # Debounce: wait until the directory stops changing
+            while True:
+                time.sleep(args.watch_debounce)
+                settled = dir_snapshot(args.leaderboards)
+                if settled == current:
+                    break
+                current = settled
+
+            print(f"\n🔄 Change detected ({describe_changes(snapshot, current)}). Re-ranking...")
+            try:
+                run(args)
+            except Exception as e:
+                print(f"❌ Re-ranking failed: {e}. Waiting for the next change.")
+            snapshot = current
+            print(f"\n👀 Watching '{args.leaderboards}' for changes (Ctrl+C to stop)...")
+    except KeyboardInterrupt:
+        print("\n[info] Stopped watching.")
+
+
+# ---------- Batch mode ----------
+def cohort_name(leaderboards_dir: str) -> str:
+    """campus_a/Leaderboards -> "campus_a"; other directories keep their own name."""
+    path = os.path.normpath(os.path.abspath(leaderboards_dir))
+    if os.path.basename(path).lower() == LEADERBOARDS_DIR.lower():
+        path = os.path.dirname(path)
+    return os.path.basename(path) or "cohort"
+
+
+def discover_cohorts(spec: str, output_dir: str = "."):
+    """
+    Resolve --batch into [(leaderboards_dir, out_file)]. spec is either a manifest file
+    (one "DIR [OUTPUT]" per line, '#' comments allowed) or a glob of directories.
+    """
+    entries = []
+    if os.path.isfile(spec):
+        base = os.path.dirname(os.path.abspath(spec))
+        with open(spec, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.split("#", 1)[0].strip()
+                if not line:
+                    continue
+                parts = line.split(None, 1)
+                leaderboards_dir = os.path.join(base, parts[0])
+                out_file = os.path.join(base, parts[1].strip()) if len(parts) > 1 else None
+                entries.append((leaderboards_dir, out_file))
+    else:
+        entries = [(d, None) for d in sorted(glob.glob(spec)) if os.path.isdir(d)]
+
+    cohorts, seen = [], set()
+    for leaderboards_dir, out_file in entries:
+        if out_file is None:
+            out_file = os.path.join(output_dir, f"{cohort_name(leaderboards_dir)}_{OUT_FILE}")
+        if out_file in seen:
+            print(f"[warn] Two cohorts write to '{out_file}'. Skipping {leaderboards_dir}.")
+            continue
+        seen.add(out_file)
+        cohorts.append((leaderboards_dir, out_file))
+    return cohorts
+
+
+def run_guarded(args):
+    """Run one batch cohort; a failure is reported so the remaining cohorts still run."""
+    try:
+        run(args)
+    except Exception as e:
+        print(f"❌ Cohort '{args.leaderboards}' failed: {e}")
+
+
+def run_cohort(args) -> str:
+    """Pool worker for batch mode: run one cohort and return everything it printed."""
+    buf = io.StringIO()
+    with contextlib.redirect_stdout(buf):
+        run_guarded(args)
+    return buf.getvalue()
+
+
+def run_batch(args):
+    """Run the full pipeline for every cohort of --batch, sharing this process and the parse cache."""
+    cohorts = discover_cohorts(args.batch, args.batch_output_dir)
+    if not cohorts:
+        print(f"❌ No leaderboard directories matched '{args.batch}'. Exiting.")
+        return
+    os.makedirs(args.batch_output_dir, exist_ok=True)
+
+    parallel = args.jobs > 1 and len(cohorts) > 1
+    cohort_args = []
+    for leaderboards_dir, out_file in cohorts:
+        cohort = argparse.Namespace(**vars(args))
+        cohort.leaderboards, cohort.output = leaderboards_dir, out_file
+        cohort.state_file = f"{os.path.splitext(out_file)[0]}{STATE_FILE}"
+        cohort.interactive = False
+        if parallel:
+            cohort.jobs = 1  # cohorts are the unit of parallelism
+        cohort_args.append(cohort)
+
+    print(f"[info] Batch mode: {len(cohorts)} cohorts" + (f" on {min(args.jobs, len(cohorts))} workers" if parallel else ""))
+    if parallel:
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(max_workers=min(args.jobs, len(cohorts))) as pool:
+            for cohort, log in zip(cohort_args, pool.map(run_cohort, cohort_args)):
+                print(f"\n===== Cohort: {cohort.leaderboards} → {cohort.output} =====")
+                print(log, end="")
+    else:
+        for cohort in cohort_args:
+            print(f"\n===== Cohort: {cohort.leaderboards} → {cohort.output} =====")
+            run_guarded(cohort)
 
 
 if __name__ == "__main__":
     print("🏆 ICPC/IUPC Team Formation — Local Excel Mode (improved)")
-    print("Make sure the 'Leaderboards' folder contains the contest .xlsx/.xls files.")
+    print("Make sure the 'Leaderboards' folder contains the contest standings (.xlsx/.xls/.csv/.tsv/.parquet).")
     main()
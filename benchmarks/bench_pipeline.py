@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Benchmark the ranker pipeline stage by stage on synthetic VJudge standings.
+
+Generates workbooks with benchmarks/synthetic.py, then times discovery, parsing
+(read_standings_file), scoring, aggregation (Participants table), team assignment
+and writing final_teams.xlsx, recording wall time and tracemalloc peak memory for each stage.
+tracemalloc slows allocation-heavy code a lot, so the pipeline runs twice: once
+untraced for the timings and once traced for the memory peaks.
+Results are emitted as JSON so runs can be compared across versions.
+
+    python benchmarks/bench_pipeline.py --users 20000 --contests 10 --output bench.json
+"""
+
+import os
+import io
+import sys
+import json
+import time
+import resource
+import platform
+import argparse
+import tempfile
+import tracemalloc
+import contextlib
+import subprocess
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, ".."))
+sys.path.insert(0, HERE)
+import Vjudge_contest_Ranker as ranker  # noqa: E402
+from synthetic import generate_leaderboards  # noqa: E402
+
+
+class StageTimer:
+    """Collect {stage: {"seconds", "peak_bytes"}} for consecutive `with timer.stage(name)` blocks."""
+
+    def __init__(self, trace_memory: bool = False):
+        self.trace_memory = trace_memory
+        self.results = {}
+
+    @contextlib.contextmanager
+    def stage(self, name: str):
+        if self.trace_memory:
+            tracemalloc.start()
+        start = time.perf_counter()
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                yield
+        finally:
+            elapsed = time.perf_counter() - start
+            peak = None
+            if self.trace_memory:
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+            self.results[name] = {"seconds": round(elapsed, 6), "peak_bytes": peak}
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=HERE,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except Exception:
+        return None
+
+
+def run_pipeline(leaderboards_dir: str, out_file: str, args, trace_memory: bool = False) -> dict:
+    # The ranker imports its heavy dependencies lazily; import them up front so the
+    # one-off import cost doesn't land in whichever stage happens to need them first
+    import numpy  # noqa: F401
+    import pandas  # noqa: F401
+    import openpyxl  # noqa: F401
+
+    timer = StageTimer(trace_memory=trace_memory)
+
+    with timer.stage("discover"):
+        files = sorted(f for f in os.listdir(leaderboards_dir) if f.lower().endswith(ranker.STANDINGS_EXTENSIONS))
+
+    with timer.stage("parse"):
+        if args.points_formula == "problems":
+            tables = {f: ranker.read_problem_standings(os.path.join(leaderboards_dir, f), args.engine) for f in files}
+            parsed = {f: ranker.problem_table_standings(t) for f, t in tables.items() if t is not None}
+        else:
+            parsed = {f: ranker.read_standings_file(os.path.join(leaderboards_dir, f), args.engine) for f in files}
+
+    with timer.stage("score"):
+        if args.points_formula == "problems":
+            all_scores = {f: ranker.score_problems(tables[f]) for f, standings in parsed.items() if standings}
+        else:
+            spec = {"formula": args.points_formula}
+            all_scores = {f: ranker.score_standings(standings, spec=spec) for f, standings in parsed.items() if standings}
+
+    with timer.stage("aggregate"):
+        participants_df = ranker.build_participants_frame(all_scores)
+
+    # Teams and write reuse the aggregated table (write_participants_and_teams_to_excel would
+    # build it again)
+    with timer.stage("teams"):
+        teams = ranker.assign_teams(participants_df["FinalPoints"].to_numpy(), args.team_size)
+
+    with timer.stage("write"):
+        engine = ranker.resolve_write_engine(args.write_engine, len(participants_df))
+        ranker.write_sheets(out_file, ranker.iter_output_sheets(participants_df, teams, args.team_layout), engine)
+
+    return {
+        "stages": timer.results,
+        "rows_parsed": sum(len(s) for s in parsed.values()),
+        "participants": 0 if participants_df is None else len(participants_df),
+        "output_bytes": os.path.getsize(out_file) if os.path.exists(out_file) else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=5000, help="size of the user pool")
+    parser.add_argument("--contests", type=int, default=5)
+    parser.add_argument("--problems", type=int, default=10)
+    parser.add_argument("--overlap", type=float, default=0.8, help="fraction of the pool in each contest")
+    parser.add_argument("--duplicates", type=float, default=0.01, help="fraction of duplicated rows per file")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--team-size", type=int, default=3)
+    parser.add_argument("--engine", choices=ranker.READ_ENGINES, default=ranker.READ_ENGINE)
+    parser.add_argument("--points-formula", choices=ranker.POINTS_FORMULAS, default=ranker.POINTS_FORMULA)
+    parser.add_argument("--write-engine", choices=ranker.WRITE_ENGINES, default=ranker.WRITE_ENGINE)
+    parser.add_argument("--team-layout", choices=ranker.TEAM_LAYOUTS, default=ranker.TEAM_LAYOUT)
+    parser.add_argument("--no-tracemalloc", action="store_true",
+                        help="skip the second, memory-traced pipeline run")
+    parser.add_argument("--output", "-o", help="write the JSON results here instead of stdout")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        leaderboards_dir = os.path.join(tmp, "Leaderboards")
+        generate_start = time.perf_counter()
+        generate_leaderboards(leaderboards_dir, args.users, args.contests, args.problems,
+                              args.overlap, args.duplicates, args.seed)
+        generate_seconds = time.perf_counter() - generate_start
+
+        out_file = os.path.join(tmp, "final_teams.xlsx")
+        results = run_pipeline(leaderboards_dir, out_file, args)
+        if not args.no_tracemalloc:
+            traced = run_pipeline(leaderboards_dir, out_file, args, trace_memory=True)
+            for name, stage in results["stages"].items():
+                stage["peak_bytes"] = traced["stages"][name]["peak_bytes"]
+
+    report = {
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "params": {k: v for k, v in vars(args).items() if k != "output"},
+        "generate_seconds": round(generate_seconds, 6),
+        **results,
+        # ru_maxrss is KiB on Linux
+        "max_rss_bytes": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+        print(f"[ok] Saved benchmark results to '{args.output}'")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
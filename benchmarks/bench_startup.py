@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Startup-time benchmark: runs common invocations of the ranker under `python -X importtime`
+and reports wall time, total import time and the most expensive top-level imports as JSON.
+
+Invocations: importing the module, `--help`, a cold run on small synthetic standings and
+a warm rerun of the same files (parsed-standings cache hit).
+
+    python benchmarks/bench_startup.py --repeat 5 --output startup.json
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SCRIPT = os.path.join(HERE, "..", "Vjudge_contest_Ranker.py")
+sys.path.insert(0, HERE)
+from synthetic import generate_leaderboards  # noqa: E402
+
+
+def parse_importtime(stderr: str, top: int):
+    """Total self time and the `top` slowest top-level imports from -X importtime output (µs)."""
+    total = 0
+    top_level = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        total += int(self_us)
+        if not name[1:].startswith(" "):  # nested imports are indented
+            top_level.append((name.strip(), int(cumulative_us)))
+    top_level.sort(key=lambda item: -item[1])
+    return total, [{"module": m, "cumulative_us": us} for m, us in top_level[:top]]
+
+
+def time_invocation(args, cwd: str, repeat: int, top: int, stdin: str = None) -> dict:
+    walls, imports = [], None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        proc = subprocess.run([sys.executable, "-X", "importtime"] + args, cwd=cwd, input=stdin,
+                              capture_output=True, text=True)
+        walls.append(time.perf_counter() - start)
+        if proc.returncode != 0:
+            raise RuntimeError(f"{args} failed:\n{proc.stdout}\n{proc.stderr}")
+        imports = parse_importtime(proc.stderr, top)
+    return {
+        "wall_seconds_median": round(statistics.median(walls), 6),
+        "wall_seconds_min": round(min(walls), 6),
+        "import_us_total": imports[0],
+        "top_imports": imports[1],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3, help="runs per invocation (median reported)")
+    parser.add_argument("--top", type=int, default=8, help="number of slowest top-level imports to list")
+    parser.add_argument("--output", "-o", help="write the JSON results here instead of stdout")
+    args = parser.parse_args()
+
+    script = os.path.abspath(SCRIPT)
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        generate_leaderboards(os.path.join(tmp, "Leaderboards"), users=300, contests=3, problems=6)
+        module_dir = os.path.dirname(script)
+        results["import"] = time_invocation(["-c", "import Vjudge_contest_Ranker"], module_dir, args.repeat, args.top)
+        results["help"] = time_invocation([script, "--help"], tmp, args.repeat, args.top)
+        # First run fills the parse cache; the repeated runs below are cache hits
+        results["cold_run"] = time_invocation([script, "--clear-cache"], tmp, 1, args.top, stdin="3\n")
+        results["cache_hit_run"] = time_invocation([script], tmp, args.repeat, args.top, stdin="3\n")
+
+    text = json.dumps({"python": sys.version.split()[0], "invocations": results}, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+        print(f"[ok] Saved startup benchmark to '{args.output}'")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
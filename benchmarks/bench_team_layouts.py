@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Benchmark: write time and file size of final_teams.xlsx for each team layout.
+
+    python benchmarks/bench_team_layouts.py --participants 1000 --contests 10 --team-size 3
+"""
+
+import os
+import io
+import sys
+import time
+import argparse
+import tempfile
+import contextlib
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import Vjudge_contest_Ranker as ranker  # noqa: E402
+
+
+def synthetic_scores(participants: int, contests: int, seed: int = 0) -> dict:
+    """{contest: {username: points}} with every participant in every contest."""
+    rng = np.random.default_rng(seed)
+    usernames = [f"user{i:06d}" for i in range(participants)]
+    all_scores = {}
+    for c in range(contests):
+        ranks = rng.permutation(participants) + 1
+        all_scores[f"contest_{c:02d}.xlsx"] = {u: ranker.points_for_rank(int(r)) for u, r in zip(usernames, ranks)}
+    return all_scores
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--participants", type=int, default=1000)
+    parser.add_argument("--contests", type=int, default=10)
+    parser.add_argument("--team-size", type=int, default=3)
+    parser.add_argument("--write-engine", choices=ranker.WRITE_ENGINES, default=ranker.WRITE_ENGINE)
+    args = parser.parse_args()
+
+    all_scores = synthetic_scores(args.participants, args.contests)
+    print(f"{args.participants} participants x {args.contests} contests, team size {args.team_size}, "
+          f"write engine {args.write_engine}")
+    print(f"{'layout':<8} {'seconds':>9} {'KiB':>10}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for layout in ranker.TEAM_LAYOUTS:
+            out_file = os.path.join(tmp, f"{layout}.xlsx")
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                ranker.write_participants_and_teams_to_excel(all_scores, args.team_size, out_file,
+                                                             engine=args.write_engine, layout=layout)
+            elapsed = time.perf_counter() - start
+            print(f"{layout:<8} {elapsed:>9.3f} {os.path.getsize(out_file) / 1024:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
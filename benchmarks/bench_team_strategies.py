@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Benchmark: time and balance of each team formation strategy.
+
+Participants get FinalPoints summed over synthetic contests; for every strategy the table
+reports the assignment time and the spread (max - min) and standard deviation of team totals.
+
+    python benchmarks/bench_team_strategies.py --participants 50000 --contests 10 --team-size 3
+"""
+
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import Vjudge_contest_Ranker as ranker  # noqa: E402
+
+
+def synthetic_final_points(participants: int, contests: int, seed: int = 0) -> np.ndarray:
+    """FinalPoints in descending order, each participant ranked randomly in every contest."""
+    rng = np.random.default_rng(seed)
+    ranks = np.argsort(rng.random((contests, participants)), axis=1) + 1
+    points = (ranker.POINTS_NUMERATOR // (ranks + ranker.POINTS_OFFSET)).sum(axis=0)
+    return np.sort(points)[::-1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--participants", type=int, default=50000)
+    parser.add_argument("--contests", type=int, default=10)
+    parser.add_argument("--team-size", type=int, default=3)
+    args = parser.parse_args()
+
+    points = synthetic_final_points(args.participants, args.contests)
+    print(f"{args.participants} participants x {args.contests} contests, team size {args.team_size}")
+    print(f"{'strategy':<11} {'seconds':>9} {'spread':>8} {'stddev':>9}")
+
+    for strategy in ranker.TEAM_STRATEGIES:
+        start = time.perf_counter()
+        teams = ranker.assign_teams(points, args.team_size, strategy)
+        elapsed = time.perf_counter() - start
+        totals = np.bincount(teams, weights=points)[1:]
+        print(f"{strategy:<11} {elapsed:>9.3f} {totals.max() - totals.min():>8.0f} {totals.std():>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
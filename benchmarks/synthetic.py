@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Synthetic VJudge standings generator.
+
+Writes .xlsx files shaped like VJudge "Download as Excel" exports: Rank, Team, Score,
+Penalty and one column per problem ("1:32:32\\n(-1)" for an accepted submission after one
+wrong try, "(-2)" for two wrong tries, " " for no attempt).
+
+    python benchmarks/synthetic.py OUT_DIR --users 20000 --contests 10 --problems 12
+"""
+
+import os
+import argparse
+
+import numpy as np
+
+
+def contest_standings(rng, pool_size: int, participants: int, problems: int, duplicates: float = 0.0):
+    """
+    Simulate one contest: draw participants from a pool of users, let them solve problems
+    according to a hidden skill, and return (header, rows) sorted by the VJudge ranking.
+    """
+    users = rng.choice(pool_size, size=participants, replace=False)
+    skill = rng.normal(size=pool_size)[users]
+    difficulty = np.sort(rng.normal(size=problems))
+
+    # Solve probability per (participant, problem), AC minute and wrong tries
+    p_solve = 1.0 / (1.0 + np.exp(difficulty[None, :] - skill[:, None] * 1.5))
+    solved = rng.random((participants, problems)) < p_solve
+    attempted = solved | (rng.random((participants, problems)) < 0.3)
+    wrong = np.where(attempted, rng.poisson(0.7, size=(participants, problems)), 0)
+    ac_seconds = rng.integers(60, 5 * 3600, size=(participants, problems))
+
+    score = solved.sum(axis=1)
+    penalty = np.where(solved, ac_seconds + wrong * 20 * 60, 0).sum(axis=1)
+    order = np.lexsort((penalty, -score))
+
+    header = ["Rank", "Team", "Score", "Penalty"]
+    for p in range(problems):
+        header.append(f"{chr(ord('A') + p % 26)}{'' if p < 26 else p // 26}\n"
+                      f"{int(solved[:, p].sum())} / {int(attempted[:, p].sum() + wrong[:, p].sum())}")
+
+    rows = []
+    for rank, i in enumerate(order, start=1):
+        cells = []
+        for p in range(problems):
+            if solved[i, p]:
+                t = int(ac_seconds[i, p])
+                tries = f"(-{wrong[i, p]})" if wrong[i, p] else " "
+                cells.append(f"{t // 3600}:{t // 60 % 60:02d}:{t % 60:02d}\n{tries}")
+            elif attempted[i, p] and wrong[i, p]:
+                cells.append(f"(-{wrong[i, p]})")
+            else:
+                cells.append(" ")
+        pen = int(penalty[i])
+        rows.append([str(rank), f"user{users[i]:06d}(Name {users[i]})", str(int(score[i])),
+                     f"{pen // 3600:02d}:{pen // 60 % 60:02d}:{pen % 60:02d}"] + cells)
+
+    # Exports occasionally repeat a participant row (e.g. re-registrations)
+    n_dup = int(len(rows) * duplicates)
+    for i in rng.choice(len(rows), size=n_dup, replace=True) if n_dup else []:
+        rows.append(list(rows[i]))
+    return header, rows
+
+
+def write_standings_xlsx(path: str, header, rows):
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Sheet1")
+    ws.append(header)
+    for row in rows:
+        ws.append(row)
+    wb.save(path)
+
+
+def generate_leaderboards(out_dir: str, users: int = 1000, contests: int = 3, problems: int = 6,
+                          overlap: float = 0.8, duplicates: float = 0.0, seed: int = 0):
+    """
+    Write `contests` synthetic standings files into out_dir and return their paths.
+    overlap: fraction of the user pool taking part in each contest.
+    duplicates: fraction of extra duplicated rows per file.
+    """
+    rng = np.random.default_rng(seed)
+    os.makedirs(out_dir, exist_ok=True)
+    participants = max(1, int(users * overlap))
+    paths = []
+    for c in range(1, contests + 1):
+        header, rows = contest_standings(rng, users, participants, problems, duplicates)
+        path = os.path.join(out_dir, f"Rank-Synthetic Contest - {c:02d}.xlsx")
+        write_standings_xlsx(path, header, rows)
+        paths.append(path)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("out_dir")
+    parser.add_argument("--users", type=int, default=1000, help="size of the user pool")
+    parser.add_argument("--contests", type=int, default=3)
+    parser.add_argument("--problems", type=int, default=6)
+    parser.add_argument("--overlap", type=float, default=0.8, help="fraction of the pool in each contest")
+    parser.add_argument("--duplicates", type=float, default=0.0, help="fraction of duplicated rows per file")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    paths = generate_leaderboards(args.out_dir, args.users, args.contests, args.problems,
+                                  args.overlap, args.duplicates, args.seed)
+    print(f"[ok] Wrote {len(paths)} files to '{args.out_dir}'")
+
+
+if __name__ == "__main__":
+    main()
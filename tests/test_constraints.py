@@ -0,0 +1,54 @@
+import json
+
+import numpy as np
+import pytest
+
+import Vjudge_contest_Ranker as ranker
+
+USERNAMES = [f"user{i}(Nick {i})" for i in range(12)]
+POINTS = np.arange(1200, 0, -100)
+CONSTRAINTS = {
+    # Sequential teams would put user0..user2 together: every rule below is violated there
+    "must_pair": [["user0", "user11"], ["user5", "user6(Nick 6)"]],
+    "must_not_pair": [["user1", "user2"], ["user3", "user4"]],
+    "seniors": ["user0", "user1", "user2", "user3"],
+    "max_seniors": 1,
+}
+
+
+@pytest.mark.parametrize("strategy", ranker.TEAM_STRATEGIES)
+def test_solver_honors_constraints(strategy):
+    teams = ranker.solve_constrained_teams(POINTS, USERNAMES, 3, CONSTRAINTS, strategy, seed=1)
+    team_of = dict(zip((u.split("(")[0] for u in USERNAMES), teams.tolist()))
+
+    assert sorted(np.bincount(teams)[1:].tolist()) == [3, 3, 3, 3]
+    assert team_of["user0"] == team_of["user11"]
+    assert team_of["user5"] == team_of["user6"]
+    assert team_of["user1"] != team_of["user2"]
+    assert team_of["user3"] != team_of["user4"]
+    senior_teams = [team_of[name] for name in CONSTRAINTS["seniors"]]
+    assert len(set(senior_teams)) == len(senior_teams)
+
+
+@pytest.mark.parametrize("constraints", [
+    {"institutions": ["x"]},
+    {"max_seniors": "1"},
+    {"must_pair": ["alice", "bob"]},
+    {"institution_quotas": {"BUET": -1}},
+    [],
+])
+def test_load_constraints_rejects_malformed_files(tmp_path, capsys, constraints):
+    path = tmp_path / "constraints.json"
+    path.write_text(json.dumps(constraints), encoding="utf-8")
+    assert ranker.load_constraints(str(path)) is None
+    assert "❌" in capsys.readouterr().out
+
+
+def test_load_constraints_accepts_documented_example(tmp_path):
+    constraints = {"must_pair": [["alice", "bob"]], "must_not_pair": [["carol", "dave"]],
+                   "seniors": ["alice", "erin"], "max_seniors": 1,
+                   "institutions": {"alice": "BUET", "bob": "DU"}, "max_per_institution": 2,
+                   "institution_quotas": {"BUET": 1}}
+    path = tmp_path / "constraints.json"
+    path.write_text(json.dumps(constraints), encoding="utf-8")
+    assert ranker.load_constraints(str(path)) == constraints
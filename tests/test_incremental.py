@@ -0,0 +1,72 @@
+import os
+import shutil
+
+import pandas as pd
+import pytest
+
+import Vjudge_contest_Ranker as ranker
+
+LEADERBOARDS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Leaderboards")
+SAMPLES = sorted(f for f in os.listdir(LEADERBOARDS) if f.endswith(".xlsx"))
+
+
+def rank(leaderboards, output, *extra):
+    ranker.main(["--team-size", "3", "--leaderboards", str(leaderboards), "--output", str(output),
+                 "--no-cache", *extra])
+
+
+def rank_full(boards, tmp_path, extra):
+    output = tmp_path / "full.xlsx"
+    rank(boards, output, *extra)
+    return output
+
+
+def assert_same_workbook(left, right):
+    a = pd.read_excel(left, sheet_name=None)
+    b = pd.read_excel(right, sheet_name=None)
+    assert list(a) == list(b)
+    for sheet in a:
+        pd.testing.assert_frame_equal(a[sheet], b[sheet], obj=sheet)
+
+
+@pytest.mark.parametrize("extra", [(), ("--points-formula", "problems", "--ratings", "--best-k", "1")],
+                         ids=["default", "problems-ratings-best1"])
+def test_incremental_matches_full_recompute(tmp_path, monkeypatch, capsys, extra):
+    monkeypatch.chdir(tmp_path)
+    boards = tmp_path / "Leaderboards"
+    boards.mkdir()
+    first, second, third = SAMPLES
+    for name in (first, second):
+        shutil.copy(os.path.join(LEADERBOARDS, name), boards / name)
+
+    state = ["--incremental", "--state-file", str(tmp_path / "state.pkl")]
+    rank(boards, tmp_path / "incremental.xlsx", *state, *extra)
+    assert_same_workbook(tmp_path / "incremental.xlsx", rank_full(boards, tmp_path, extra))
+
+    # One file added, one removed: the state reuses the unchanged file and subtracts the removed one
+    shutil.copy(os.path.join(LEADERBOARDS, third), boards / third)
+    os.remove(boards / first)
+    capsys.readouterr()
+    rank(boards, tmp_path / "incremental.xlsx", *state, *extra)
+    out = capsys.readouterr().out
+    assert f"Unchanged since last run: {second}" in out
+    assert f"{first} was removed since the last run" in out
+    assert_same_workbook(tmp_path / "incremental.xlsx", rank_full(boards, tmp_path, extra))
+
+
+def test_incremental_removes_files_with_zero_point_rows(tmp_path, monkeypatch):
+    # codeforces gives 0 points below the median, so some users only ever score 0 and
+    # their FinalPoints stays 0 while files are removed one at a time
+    monkeypatch.chdir(tmp_path)
+    boards = tmp_path / "Leaderboards"
+    boards.mkdir()
+    for name in SAMPLES:
+        shutil.copy(os.path.join(LEADERBOARDS, name), boards / name)
+    extra = ("--points-formula", "codeforces")
+    state = ["--incremental", "--state-file", str(tmp_path / "state.pkl")]
+
+    rank(boards, tmp_path / "incremental.xlsx", *state, *extra)
+    for name in SAMPLES[:2]:
+        os.remove(boards / name)
+        rank(boards, tmp_path / "incremental.xlsx", *state, *extra)
+        assert_same_workbook(tmp_path / "incremental.xlsx", rank_full(boards, tmp_path, extra))
@@ -0,0 +1,34 @@
+import glob
+import math
+import os
+
+import pandas as pd
+import pytest
+
+import Vjudge_contest_Ranker as ranker
+
+LEADERBOARDS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Leaderboards")
+SAMPLES = sorted(glob.glob(os.path.join(LEADERBOARDS, "*.xlsx")))
+
+
+@pytest.mark.parametrize("path", SAMPLES, ids=os.path.basename)
+def test_read_engines_agree_on_samples(path):
+    streamed = ranker.read_excel_file(path, "openpyxl")
+    loaded = ranker.read_excel_file(path, "pandas")
+    assert streamed
+    assert streamed == loaded
+
+
+def test_sample_files_present():
+    assert len(SAMPLES) == 3
+
+
+def test_parse_standings_frame_matches_clean_standing():
+    users = ["alice", " bob ", "carol", "dave", "erin", "frank", "", "   ", None, math.nan, "gina", "hank",
+             "ivan", "judy"]
+    ranks = [1, " 3 ", 3.7, "inf", 0, math.nan, 5, 6, 7, 8, "2.0", "-1", "x", None]
+    df = pd.DataFrame({"Username": pd.Series(users, dtype=object), "Rank": pd.Series(ranks, dtype=object)})
+
+    expected = [s for s in map(ranker.clean_standing, users, ranks) if s is not None]
+    assert ranker.parse_standings_frame(df, "Username", "Rank") == expected
+    assert expected == [("alice", 1), ("bob", 3), ("carol", 3), ("gina", 2)]